@@ -0,0 +1,40 @@
+"""
+Regression tests for the streaming key loader
+"""
+import numpy as np
+import pytest
+from tree_loader import iter_key_chunks, load_keys
+
+def _text_keys(path, chunk_bytes):
+    chunks = list(iter_key_chunks(str(path), "text", chunk_bytes=chunk_bytes))
+    return np.concatenate(chunks).tolist() if chunks else []
+
+@pytest.mark.parametrize("chunk_bytes", range(1, 12))
+def test_chunk_boundary_inside_trailing_newline(tmp_path, chunk_bytes):
+    path = tmp_path / "keys.txt"
+    path.write_bytes(b"1 2 3\r\n")
+    assert _text_keys(path, chunk_bytes) == [1, 2, 3]
+
+def test_crlf_lines_split_across_chunks(tmp_path):
+    path = tmp_path / "keys.txt"
+    keys = list(range(-50, 50))
+    path.write_bytes(b"".join(b"%d\r\n" % k for k in keys))
+    for chunk_bytes in (2, 3, 5, 8, 13):
+        assert _text_keys(path, chunk_bytes) == keys
+
+def test_whitespace_only_file_has_no_keys(tmp_path):
+    path = tmp_path / "keys.txt"
+    path.write_bytes(b" \r\n\t\n")
+    assert load_keys(str(path)).size == 0
+
+def test_text_key_out_of_int64_range(tmp_path):
+    path = tmp_path / "keys.txt"
+    path.write_bytes(b"1 99999999999999999999\n")
+    with pytest.raises(ValueError):
+        load_keys(str(path))
+
+def test_uint64_npy_key_out_of_int64_range(tmp_path):
+    path = tmp_path / "keys.npy"
+    np.save(path, np.array([1, 2 ** 63], dtype=np.uint64))
+    with pytest.raises(ValueError):
+        load_keys(str(path))
@@ -0,0 +1,253 @@
+"""
+Columnar NumPy export of the trees and vectorized analysis on top of it
+"""
+import numpy as np
+
+def tree_to_arrays(tree):
+    """Flatten a tree into NumPy arrays in breadth-first order.
+    
+    Binary trees give one row per node: ``key``, ``parent``, ``left``, ``right``
+    and ``depth`` (-1 marks a missing link), plus ``height`` for AVL nodes and
+    ``color`` (1 = red, 0 = black) for red-black nodes.
+    
+    2-3 trees give one row per node with CSR-style offsets: the keys of node i
+    are ``keys[key_start[i]:key_start[i + 1]]`` and its children are
+    ``children[child_start[i]:child_start[i + 1]]``, plus ``parent`` and
+    ``depth``.
+    """
+    if tree.root is not None and hasattr(tree.root, 'children'):
+        return _multiway_to_arrays(tree.root)
+    return _binary_to_arrays(tree.root)
+
+def _binary_to_arrays(root):
+    nodes = [root] if root is not None else []
+    parent = [-1] * len(nodes)
+    depth = [0] * len(nodes)
+    left = []
+    right = []
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        for child, links in ((node.left, left), (node.right, right)):
+            if child is None:
+                links.append(-1)
+            else:
+                links.append(len(nodes))
+                nodes.append(child)
+                parent.append(i)
+                depth.append(depth[i] + 1)
+        i += 1
+    
+    arrays = {
+        "key": np.array([n.key for n in nodes]),
+        "parent": np.array(parent, dtype=np.int64),
+        "left": np.array(left, dtype=np.int64),
+        "right": np.array(right, dtype=np.int64),
+        "depth": np.array(depth, dtype=np.int64),
+    }
+    if root is not None and hasattr(root, 'height'):
+        arrays["height"] = np.array([n.height for n in nodes], dtype=np.int64)
+    if root is not None and hasattr(root, 'color'):
+        arrays["color"] = np.array([n.color == "RED" for n in nodes], dtype=np.int8)
+    return arrays
+
+def _multiway_to_arrays(root):
+    nodes = [root]
+    parent = [-1]
+    depth = [0]
+    keys = []
+    key_start = [0]
+    children = []
+    child_start = [0]
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        keys.extend(node.keys)
+        key_start.append(len(keys))
+        for child in node.children:
+            if child is not None:
+                children.append(len(nodes))
+                nodes.append(child)
+                parent.append(i)
+                depth.append(depth[i] + 1)
+        child_start.append(len(children))
+        i += 1
+    
+    return {
+        "keys": np.array(keys),
+        "key_start": np.array(key_start, dtype=np.int64),
+        "children": np.array(children, dtype=np.int64),
+        "child_start": np.array(child_start, dtype=np.int64),
+        "parent": np.array(parent, dtype=np.int64),
+        "depth": np.array(depth, dtype=np.int64),
+    }
+
+def _is_multiway(arrays):
+    return "child_start" in arrays
+
+def _child_counts(arrays):
+    if _is_multiway(arrays):
+        return np.diff(arrays["child_start"])
+    return (arrays["left"] >= 0).astype(np.int64) + (arrays["right"] >= 0)
+
+def _keys_where(arrays, node_mask):
+    """Keys of the selected nodes"""
+    if _is_multiway(arrays):
+        key_mask = np.repeat(node_mask, np.diff(arrays["key_start"]))
+        return arrays["keys"][key_mask]
+    return arrays["key"][node_mask]
+
+def leaf_keys(arrays):
+    """Keys held in nodes with no children"""
+    return _keys_where(arrays, _child_counts(arrays) == 0)
+
+def parent_keys(arrays):
+    """Keys held in nodes with at least one child"""
+    return _keys_where(arrays, _child_counts(arrays) > 0)
+
+def one_child_keys(arrays):
+    """Keys held in nodes with exactly one child"""
+    return _keys_where(arrays, _child_counts(arrays) == 1)
+
+def two_child_keys(arrays):
+    """Keys held in nodes with exactly two children"""
+    return _keys_where(arrays, _child_counts(arrays) == 2)
+
+def depth_histogram(arrays):
+    """Number of keys at each depth, as Tree.depth_histogram() reports it"""
+    depth = arrays["depth"]
+    if _is_multiway(arrays):
+        depth = np.repeat(depth, np.diff(arrays["key_start"]))
+    if depth.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.bincount(depth)
+
+def _levels(arrays):
+    """Slices of the node arrays for each depth, deepest first (rows are BFS ordered)"""
+    depth = arrays["depth"]
+    if depth.size == 0:
+        return []
+    bounds = np.searchsorted(depth, np.arange(depth[-1] + 2))
+    return [slice(bounds[d], bounds[d + 1]) for d in range(depth[-1], -1, -1)]
+
+def check_invariants(arrays):
+    """Return a list of violated invariants (empty when the tree is valid)"""
+    if arrays["depth"].size == 0:
+        return []
+    if _is_multiway(arrays):
+        return _check_multiway(arrays)
+    return _check_binary(arrays)
+
+def _check_links(arrays, child, errors):
+    has = child >= 0
+    if np.any(arrays["parent"][child[has]] != np.nonzero(has)[0]):
+        errors.append("child parent link mismatch")
+
+def _check_binary(arrays):
+    errors = []
+    key, left, right = arrays["key"], arrays["left"], arrays["right"]
+    _check_links(arrays, left, errors)
+    _check_links(arrays, right, errors)
+    
+    # Subtree minimum/maximum and heights, filled in bottom-up one level at a time
+    low = key.copy()
+    high = key.copy()
+    height = np.ones(key.size, dtype=np.int64)
+    black = np.zeros(key.size, dtype=np.int64)
+    color = arrays.get("color")
+    order_ok = True
+    black_ok = True
+    for level in _levels(arrays):
+        l, r = left[level], right[level]
+        hl = np.where(l >= 0, height[l], 0)
+        hr = np.where(r >= 0, height[r], 0)
+        height[level] = 1 + np.maximum(hl, hr)
+        has_l, has_r = l >= 0, r >= 0
+        k = key[level]
+        order_ok &= bool(np.all(~has_l | (high[l] <= k)) and np.all(~has_r | (low[r] >= k)))
+        low[level] = np.where(has_l, low[l], k)
+        high[level] = np.where(has_r, high[r], k)
+        if color is not None:
+            bl = np.where(has_l, black[l], 0)
+            br = np.where(has_r, black[r], 0)
+            black_ok &= bool(np.all(bl == br))
+            black[level] = bl + (color[level] == 0)
+    
+    if not order_ok:
+        errors.append("search order violated")
+    if "height" in arrays:
+        if np.any(arrays["height"] != height):
+            errors.append("stored AVL heights are wrong")
+        hl = np.where(left >= 0, height[left], 0)
+        hr = np.where(right >= 0, height[right], 0)
+        if np.any(np.abs(hl - hr) > 1):
+            errors.append("AVL balance factor outside -1..1")
+    if color is not None:
+        if color[0] != 0:
+            errors.append("red root")
+        red = color == 1
+        if np.any(red & (left >= 0) & (color[left] == 1)) or np.any(red & (right >= 0) & (color[right] == 1)):
+            errors.append("red node with red child")
+        if not black_ok:
+            errors.append("unequal black heights")
+    return errors
+
+def _check_multiway(arrays):
+    errors = []
+    keys, key_start = arrays["keys"], arrays["key_start"]
+    children, child_start = arrays["children"], arrays["child_start"]
+    key_counts = np.diff(key_start)
+    child_counts = np.diff(child_start)
+    
+    if np.any((key_counts < 1) | (key_counts > 2)):
+        errors.append("node with other than 1 or 2 keys")
+    internal = child_counts > 0
+    if np.any(internal & (child_counts != key_counts + 1)):
+        errors.append("internal node child count is not keys + 1")
+    parent_of = np.repeat(np.arange(child_counts.size), child_counts)
+    if np.any(arrays["parent"][children] != parent_of):
+        errors.append("child parent link mismatch")
+    leaf_depth = arrays["depth"][~internal]
+    if leaf_depth.size and np.any(leaf_depth != leaf_depth[0]):
+        errors.append("leaves on different levels")
+    
+    # Keys inside each node must be sorted
+    same_node = np.repeat(np.arange(key_counts.size), key_counts)
+    if np.any((np.diff(same_node) == 0) & (np.diff(keys) <= 0)):
+        errors.append("node keys out of order")
+    
+    # Separator order, checked bottom-up with subtree minimum/maximum
+    first_key = keys[key_start[:-1]]
+    last_key = keys[key_start[1:] - 1]
+    low = first_key.copy()
+    high = last_key.copy()
+    if children.size == 0:
+        return errors
+    first_child = np.where(internal, children[np.minimum(child_start[:-1], children.size - 1)], -1)
+    last_child = np.where(internal, children[np.maximum(child_start[1:] - 1, 0)], -1)
+    for level in _levels(arrays):
+        fc, lc = first_child[level], last_child[level]
+        has = fc >= 0
+        low[level] = np.where(has, low[fc], first_key[level])
+        high[level] = np.where(has, high[lc], last_key[level])
+    
+    # Child j of a node lies between the node's keys j - 1 and j
+    slot = np.arange(children.size) - np.repeat(child_start[:-1], child_counts)
+    above = key_start[:-1][parent_of] + slot
+    below = above - 1
+    has_above = slot < key_counts[parent_of]
+    has_below = slot > 0
+    if (np.any(has_above & (high[children] >= keys[np.minimum(above, keys.size - 1)])) or
+            np.any(has_below & (low[children] <= keys[np.maximum(below, 0)]))):
+        errors.append("separator order violated")
+    return errors
+
+def classify(tree):
+    """Root, leaf and parent keys of a tree, computed from its arrays"""
+    arrays = tree_to_arrays(tree)
+    return {
+        "leaves": leaf_keys(arrays).tolist(),
+        "parents": parent_keys(arrays).tolist(),
+        "parents_one": one_child_keys(arrays).tolist(),
+        "parents_two": two_child_keys(arrays).tolist(),
+    }
@@ -0,0 +1,355 @@
+"""
+Headless benchmark runner for Tree Simulator
+"""
+import argparse
+import json
+import random
+import time
+from tree_simulator import TREE_TYPES, generate_test_cases
+from tree_latency import LatencyRecorder
+from tree_memory import measure_workload, format_memory
+
+def shape_stats(tree):
+    return {
+        "height": tree.height(),
+        "average_depth": round(tree.average_depth(), 3),
+        "max_imbalance": tree.max_imbalance(),
+    }
+
+def run_workload(tree_class, data, rng, recorder=None):
+    """Insert all keys, search every key plus as many misses, then delete half"""
+    recorder = recorder or LatencyRecorder()
+    tree = recorder.attach(tree_class())
+    
+    start = time.perf_counter()
+    for key in data:
+        tree.insert(key)
+    insert_time = time.perf_counter() - start
+    shape = shape_stats(tree)
+    
+    present = list(data)
+    rng.shuffle(present)
+    top = max(data) + 1 if data else 1
+    probes = present + [top + i for i in range(len(present))]
+    rng.shuffle(probes)
+    start = time.perf_counter()
+    for key in probes:
+        tree.search(key)
+    search_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for key in present[:len(present) // 2]:
+        tree.delete(key)
+    delete_time = time.perf_counter() - start
+    
+    recorder.detach(tree)
+    return {
+        "nodes": len(data),
+        "shape": shape,
+        "insert_total_s": insert_time,
+        "search_total_s": search_time,
+        "delete_total_s": delete_time,
+        "latency": recorder.summary(),
+    }
+
+def run_benchmark(tree_names=None, seed=None, repeat=1, history=None):
+    """Run every case against every tree type; returns a JSON-ready dict.
+    
+    With a tree_history.HistoryStore every case and tree is also recorded as a run.
+    """
+    tree_names = tree_names or list(TREE_TYPES)
+    seed = seed if seed is not None else random.randrange(2**32)
+    random.seed(seed)
+    cases = dict(zip(("case1", "case2", "case3"), generate_test_cases()))
+    
+    results = {"seed": seed, "repeat": repeat, "cases": {}}
+    for case_name, data in cases.items():
+        results["cases"][case_name] = {}
+        for name in tree_names:
+            recorder = LatencyRecorder()
+            rng = random.Random(seed)
+            runs = [run_workload(TREE_TYPES[name], data, rng, recorder) for _ in range(repeat)]
+            result = runs[-1]
+            for field in ("insert_total_s", "search_total_s", "delete_total_s"):
+                result[field] = min(r[field] for r in runs)
+            result["latency"] = recorder.summary()
+            result["memory"] = measure_workload(TREE_TYPES[name], data, random.Random(seed))
+            results["cases"][case_name][name] = result
+            if history is not None:
+                totals = {field: result[field] for field in ("insert_total_s", "search_total_s", "delete_total_s")}
+                totals["repeat"] = repeat
+                history.record_run(name, case_name, len(data), seed, recorder, totals)
+    return results
+
+def run_snapshot_benchmark(size, probes, seed=None, tree_name="AVLTree"):
+    """Compare per-key tree searches with batch searches on frozen snapshots"""
+    import numpy as np
+    rng = random.Random(seed)
+    tree = TREE_TYPES[tree_name]()
+    for key in rng.sample(range(10 * size), size):
+        tree.insert(key)
+    batch = np.array([rng.randrange(10 * size) for _ in range(probes)])
+    
+    sample = batch[:min(probes, 100000)].tolist()
+    start = time.perf_counter()
+    for key in sample:
+        tree.search(key)
+    results = {"tree": tree_name, "size": size, "probes": probes,
+               "tree_search_per_s": len(sample) / (time.perf_counter() - start)}
+    for layout in ("eytzinger", "veb"):
+        start = time.perf_counter()
+        frozen = tree.freeze(layout)
+        freeze_time = time.perf_counter() - start
+        start = time.perf_counter()
+        frozen.search_many(batch)
+        results[layout] = {"freeze_s": freeze_time,
+                           "search_many_per_s": probes / (time.perf_counter() - start)}
+    return results
+
+def burst_delete_ops(size, bursts, burst_size, quiet, rng):
+    """Operation list: build, then bursts that purge a contiguous run of keys, each followed by searches"""
+    keys = rng.sample(range(10 * size), size)
+    ops = [("insert", key) for key in keys]
+    live = sorted(keys)
+    for _ in range(bursts):
+        start = rng.randrange(max(1, len(live) - burst_size))
+        run = live[start:start + burst_size]
+        del live[start:start + burst_size]
+        rng.shuffle(run)
+        ops.extend(("delete", key) for key in run)
+        if live:
+            ops.extend(("search", rng.choice(live)) for _ in range(quiet))
+    return ops
+
+def run_burst_benchmark(tree_names=None, size=20000, bursts=5, burst_size=2000, quiet=20000,
+                        fraction=0.25, seed=None):
+    """Eager against lazy (tombstone) deletion on a burst-delete workload"""
+    tree_names = tree_names or list(TREE_TYPES)
+    ops = burst_delete_ops(size, bursts, burst_size, quiet, random.Random(seed))
+    results = {"size": size, "bursts": bursts, "burst_size": burst_size, "quiet": quiet,
+               "fraction": fraction, "trees": {}}
+    for name in tree_names:
+        results["trees"][name] = {}
+        for mode in ("eager", "lazy"):
+            tree = TREE_TYPES[name]()
+            if mode == "lazy":
+                tree.enable_lazy_delete(fraction)
+            recorder = LatencyRecorder()
+            recorder.attach(tree)
+            methods = {op: getattr(tree, op) for op in ("insert", "delete", "search")}
+            start = time.perf_counter()
+            for op, key in ops:
+                methods[op](key)
+            elapsed = time.perf_counter() - start
+            recorder.detach(tree)
+            results["trees"][name][mode] = {"total_s": elapsed, "height": tree.height(),
+                                            "latency": recorder.summary()}
+    return results
+
+def run_shapes(size, rng):
+    """Keys shaped like generate_test_cases cases 2 and 3, scaled to size"""
+    half = size // 2
+    return {"case2": list(range(1, half + 1)) + rng.sample(range(half + 1, 4 * size), size - half),
+            "case3": rng.sample(range(1, 2 * size), size - half) + list(range(4 * size, 4 * size - half, -1))}
+
+def run_finger_benchmark(tree_names=None, size=20000, seed=None, repeat=1):
+    """Building with one insert per key against insert_many, which uses finger insertion in runs"""
+    tree_names = tree_names or list(TREE_TYPES)
+    shapes = run_shapes(size, random.Random(seed))
+    results = {"size": size, "cases": {}}
+    for case_name, data in shapes.items():
+        results["cases"][case_name] = {}
+        for name in tree_names:
+            times = {"insert_s": [], "insert_many_s": []}
+            for _ in range(repeat):
+                tree = TREE_TYPES[name]()
+                start = time.perf_counter()
+                for key in data:
+                    tree.insert(key)
+                times["insert_s"].append(time.perf_counter() - start)
+                tree = TREE_TYPES[name]()
+                start = time.perf_counter()
+                tree.insert_many(data)
+                times["insert_many_s"].append(time.perf_counter() - start)
+            result = {field: min(values) for field, values in times.items()}
+            result["height"] = tree.height()
+            results["cases"][case_name][name] = result
+    return results
+
+def format_finger_results(results):
+    lines = [f"Build from {results['size']} run-shaped keys",
+             f"{'case':<7}{'tree':<15}{'insert s':>10}{'many s':>10}{'speedup':>9}{'height':>8}"]
+    for case_name, trees in results["cases"].items():
+        for name, r in trees.items():
+            lines.append(f"{case_name:<7}{name:<15}{r['insert_s']:>10.4f}{r['insert_many_s']:>10.4f}"
+                         f"{r['insert_s'] / r['insert_many_s']:>8.1f}x{r['height']:>8}")
+    return "\n".join(lines)
+
+def run_buffer_benchmark(tree_names=None, size=20000, capacity=4096, seed=None, repeat=1):
+    """Ingest throughput with direct inserts against the write buffer, including the final flush"""
+    tree_names = tree_names or list(TREE_TYPES)
+    shapes = run_shapes(size, random.Random(seed))
+    results = {"size": size, "capacity": capacity, "cases": {}}
+    for case_name, data in shapes.items():
+        results["cases"][case_name] = {}
+        for name in tree_names:
+            times = {"direct_s": [], "buffered_s": []}
+            for _ in range(repeat):
+                for mode, field in ((False, "direct_s"), (True, "buffered_s")):
+                    tree = TREE_TYPES[name]()
+                    if mode:
+                        tree.enable_write_buffer(capacity)
+                    insert = tree.insert
+                    start = time.perf_counter()
+                    for key in data:
+                        insert(key)
+                    if mode:
+                        tree.flush()
+                    times[field].append(time.perf_counter() - start)
+            result = {field: min(values) for field, values in times.items()}
+            result["direct_keys_per_s"] = len(data) / result["direct_s"]
+            result["buffered_keys_per_s"] = len(data) / result["buffered_s"]
+            results["cases"][case_name][name] = result
+    return results
+
+def run_degenerate_benchmark(size=4000, factor=2.0, seed=None, repeat=1):
+    """Sorted inserts and then random searches at sizes size/8 to size, plain BST against the rebalancing one.
+    
+    AVL is included for reference. A plain BST built from sorted keys is a
+    list, so its cost per operation grows linearly with the size.
+    """
+    from tree_simulator import BST, AVLTree
+    rng = random.Random(seed)
+    modes = {"BST": BST, "BST+DSW": BST, "AVLTree": AVLTree}
+    results = {"factor": factor, "sizes": {}}
+    n = max(size // 8, 1)
+    while True:
+        probes = [rng.randrange(n) for _ in range(n)]
+        results["sizes"][n] = {}
+        for mode, cls in modes.items():
+            times = {"insert_s": [], "search_s": []}
+            for _ in range(repeat):
+                tree = cls()
+                if mode == "BST+DSW":
+                    tree.enable_rebalancing(factor)
+                start = time.perf_counter()
+                for key in range(n):
+                    tree.insert(key)
+                times["insert_s"].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                for key in probes:
+                    tree.search(key)
+                times["search_s"].append(time.perf_counter() - start)
+            result = {"insert_us": min(times["insert_s"]) / n * 1e6, "search_us": min(times["search_s"]) / n * 1e6,
+                      "height": tree.height()}
+            if mode == "BST+DSW":
+                result["rebuilds"] = tree.rebuilds
+            results["sizes"][n][mode] = result
+        if n >= size:
+            break
+        n = min(n * 2, size)
+    return results
+
+def format_degenerate_results(results):
+    lines = [f"Sorted inserts then random searches, rebuild above {results['factor']} * log2(n) levels",
+             f"{'keys':>8} {'tree':<10}{'insert us':>11}{'search us':>11}{'height':>8}{'rebuilds':>10}"]
+    for n, trees in results["sizes"].items():
+        for mode, r in trees.items():
+            lines.append(f"{n:>8} {mode:<10}{r['insert_us']:>11.2f}{r['search_us']:>11.2f}{r['height']:>8}"
+                         f"{r.get('rebuilds', ''):>10}")
+    return "\n".join(lines)
+
+def format_buffer_results(results):
+    lines = [f"Ingest of {results['size']} run-shaped keys, buffer of {results['capacity']} keys",
+             f"{'case':<7}{'tree':<15}{'direct/s':>12}{'buffered/s':>12}{'gain':>8}"]
+    for case_name, trees in results["cases"].items():
+        for name, r in trees.items():
+            lines.append(f"{case_name:<7}{name:<15}{r['direct_keys_per_s']:>12,.0f}{r['buffered_keys_per_s']:>12,.0f}"
+                         f"{r['buffered_keys_per_s'] / r['direct_keys_per_s']:>7.1f}x")
+    return "\n".join(lines)
+
+def format_burst_results(results):
+    lines = [f"{results['bursts']} bursts of {results['burst_size']} deletes on {results['size']} keys, "
+             f"{results['quiet']} searches after each, lazy rebuild at {results['fraction']:.0%} tombstones",
+             f"{'tree':<15}{'mode':<7}{'total s':>9}{'del p50':>10}{'del p99':>10}{'del max':>10}"
+             f"{'srch p50':>10}{'srch p99':>10}"]
+    for name, modes in results["trees"].items():
+        for mode, r in modes.items():
+            d, s = r["latency"]["delete"], r["latency"]["search"]
+            lines.append(f"{name:<15}{mode:<7}{r['total_s']:>9.3f}{d['p50_ns']:>10}{d['p99_ns']:>10}"
+                         f"{d['max_ns']:>10}{s['p50_ns']:>10}{s['p99_ns']:>10}")
+    return "\n".join(lines)
+
+def format_results(results):
+    lines = [f"Seed: {results['seed']}"]
+    for case_name, trees in results["cases"].items():
+        lines.append(f"\n{case_name}")
+        lines.append(f"{'tree':<15}{'op':<8}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'p99.9':>10}{'max':>10}")
+        for name, result in trees.items():
+            for op, s in result["latency"].items():
+                lines.append(f"{name:<15}{op:<8}{s['count']:>8}{s['p50_ns']:>10}{s['p90_ns']:>10}"
+                             f"{s['p99_ns']:>10}{s['p99.9_ns']:>10}{s['max_ns']:>10}")
+        lines.append("")
+        lines.append(format_memory({name: result["memory"] for name, result in trees.items()}))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tree implementations")
+    parser.add_argument("--trees", nargs="+", choices=list(TREE_TYPES), help="tree types to run (default: all)")
+    parser.add_argument("--seed", type=int, help="random seed for the test cases")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per tree and case")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--history", metavar="DB",
+                        help="also record every run in this SQLite history file (see tree_history.py check)")
+    parser.add_argument("--snapshot", type=int, metavar="N",
+                        help="instead compare frozen snapshot batch search on N keys (needs NumPy)")
+    parser.add_argument("--probes", type=int, default=1000000, help="probes for --snapshot")
+    parser.add_argument("--burst", type=int, metavar="N",
+                        help="instead compare eager and lazy deletion on bursts of deletes from N keys")
+    parser.add_argument("--fraction", type=float, default=0.25, help="lazy rebuild threshold for --burst")
+    parser.add_argument("--finger", type=int, metavar="N",
+                        help="instead compare per-key inserts with insert_many on N keys shaped like cases 2 and 3")
+    parser.add_argument("--buffer", type=int, metavar="N",
+                        help="instead compare direct and write-buffered ingest of N keys shaped like cases 2 and 3")
+    parser.add_argument("--capacity", type=int, default=4096, help="write buffer size for --buffer")
+    parser.add_argument("--degenerate", type=int, metavar="N",
+                        help="instead compare the plain and rebalancing BST on sorted inserts of up to N keys")
+    parser.add_argument("--factor", type=float, default=2.0, help="height factor for --degenerate")
+    args = parser.parse_args()
+    
+    if args.degenerate:
+        results = run_degenerate_benchmark(args.degenerate, args.factor, args.seed, args.repeat)
+        print(format_degenerate_results(results))
+    elif args.buffer:
+        results = run_buffer_benchmark(args.trees, args.buffer, args.capacity, args.seed, args.repeat)
+        print(format_buffer_results(results))
+    elif args.finger:
+        results = run_finger_benchmark(args.trees, args.finger, args.seed, args.repeat)
+        print(format_finger_results(results))
+    elif args.burst:
+        results = run_burst_benchmark(args.trees, args.burst, burst_size=args.burst // 10,
+                                      quiet=args.burst, fraction=args.fraction, seed=args.seed)
+        print(format_burst_results(results))
+    elif args.snapshot:
+        results = run_snapshot_benchmark(args.snapshot, args.probes, args.seed)
+        print(f"{results['tree']} search: {results['tree_search_per_s']:,.0f} keys/s")
+        for layout in ("eytzinger", "veb"):
+            r = results[layout]
+            print(f"{layout} search_many: {r['search_many_per_s']:,.0f} keys/s "
+                  f"({r['search_many_per_s'] / results['tree_search_per_s']:.0f}x), frozen in {r['freeze_s']:.3f}s")
+    elif args.history:
+        from tree_history import HistoryStore
+        with HistoryStore(args.history) as history:
+            results = run_benchmark(args.trees, args.seed, args.repeat, history)
+        print(format_results(results))
+        print(f"\nRuns recorded in {args.history}")
+    else:
+        results = run_benchmark(args.trees, args.seed, args.repeat)
+        print(format_results(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Canvas view for Tree Simulator - linear tidy layout, viewport culling, level of detail and incremental relayout
+"""
+import time
+import tkinter as tk
+from tkinter import ttk
+
+SLOT_PX = 36  # width of one leaf slot at zoom 1
+LEVEL_PX = 60  # distance between levels at zoom 1
+MIN_LEVEL_PX = 28  # levels never get closer than this when zooming out
+MARGIN_PX = 20
+SUMMARY_PX = 24  # subtrees narrower than this on screen are drawn as one glyph
+LABEL_PX = 22  # keys are only written when a slot is at least this wide
+GAP = 0.5  # slots reserved for a missing child, so single children lean to their side
+
+def _children(node):
+    if hasattr(node, 'children'):
+        return [c for c in node.children if c is not None]
+    return [c for c in (node.left, node.right) if c is not None]
+
+def _signature(node):
+    """What the layout of a node depends on, compared by identity for the children"""
+    if hasattr(node, 'children'):
+        return tuple(node.children), tuple(node.keys)
+    return node.left, node.right, node.key
+
+class TreeLayout:
+    """Subtree widths and centers in leaf slots, cached per node object.
+    
+    The subtree of a node covers [left, left + width) and the node sits at
+    left + center. Children are packed left to right, so absolute positions
+    are only worked out for the nodes that get drawn, and a change only has to
+    redo the subtree it happened in plus the widths on the path above it.
+    """
+    def __init__(self):
+        self.root = None
+        self.info = {}  # node -> [width, center, keys in subtree, signature]
+    
+    def build(self, root):
+        self.root = root
+        self.info = {}
+        if root is not None:
+            self._layout_subtree(root)
+    
+    def _layout_subtree(self, top):
+        """Place every node below top, children first; returns how many were placed"""
+        placed = 0
+        stack = [(top, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                self._place(node)
+                placed += 1
+            else:
+                stack.append((node, True))
+                stack.extend((c, False) for c in _children(node))
+        return placed
+    
+    def _place(self, node):
+        info = self.info
+        if hasattr(node, 'children'):
+            kids = [c for c in node.children if c is not None]
+            count = len(node.keys)
+            if kids:
+                width = 0
+                for child in kids:
+                    child_info = info[child]
+                    width += child_info[0]
+                    count += child_info[2]
+                last = info[kids[-1]]
+                center = (info[kids[0]][1] + width - last[0] + last[1]) / 2
+            else:
+                width = max(len(node.keys), 1)
+                center = width / 2
+        else:
+            left, right = node.left, node.right
+            count = 1
+            if left is None and right is None:
+                width, center = 1, 0.5
+            else:
+                if left is not None:
+                    lw, lc, lcount, _ = info[left]
+                    count += lcount
+                else:
+                    lw, lc = GAP, GAP / 2
+                if right is not None:
+                    rw, rc, rcount, _ = info[right]
+                    count += rcount
+                else:
+                    rw, rc = GAP, GAP / 2
+                width = lw + rw
+                center = (lc + lw + rc) / 2
+        info[node] = [width, center, count, _signature(node)]
+    
+    def path(self, key):
+        """Nodes on the search path for key, with their signatures, recorded before a change"""
+        path = []
+        node = self.root
+        while node is not None:
+            path.append((node, _signature(node)))
+            if hasattr(node, 'children'):
+                if key in node.keys or not node.children:
+                    break
+                i = 0
+                while i < len(node.keys) and key > node.keys[i]:
+                    i += 1
+                node = node.children[i] if i < len(node.children) else None
+            else:
+                if key == node.key:
+                    break
+                node = node.left if key < node.key else node.right
+        return path
+    
+    def update(self, root, path):
+        """Relayout after a change to the key whose path() was recorded.
+        
+        Everything a change touches lies below the topmost path node whose
+        children or keys differ (or below the end of the path if none do), so
+        only that subtree and the widths above it are recomputed. Returns the
+        number of nodes placed.
+        """
+        if root is not self.root or not path:
+            self.build(root)
+            return len(self.info)
+        top = len(path) - 1
+        for i, (node, signature) in enumerate(path):
+            if _signature(node) != signature:
+                top = i
+                break
+        if top == 0:
+            self.build(root)
+            return len(self.info)
+        placed = self._layout_subtree(path[top][0])
+        for node, _ in reversed(path[:top]):
+            self._place(node)
+        if len(self.info) > 2 * self.info[root][2] + 64:
+            # Drop the entries of deleted nodes now and then
+            self.build(root)
+            return len(self.info)
+        return placed + top
+
+class TreeCanvas(ttk.Frame):
+    """Pannable, zoomable drawing of a tree that only draws what is on screen.
+    
+    Drag to pan, use the mouse wheel to zoom and double-click to fit the
+    whole tree. Call prepare(key) before changing the tree and refresh()
+    afterwards to relayout just the part that changed.
+    """
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.canvas = tk.Canvas(self, background="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.status = ttk.Label(self, anchor=tk.W)
+        self.status.pack(fill=tk.X)
+        
+        self.layout = TreeLayout()
+        self.tree = None
+        self.scale = 1.0
+        self.offset_x = 0.0  # screen pixels scrolled past the left of the layout
+        self.offset_y = 0.0
+        self._path = None
+        self._drag = None
+        self._pending = None
+        self._layout_note = ""
+        
+        self.canvas.bind("<ButtonPress-1>", self._start_drag)
+        self.canvas.bind("<B1-Motion>", self._drag_to)
+        self.canvas.bind("<Double-Button-1>", lambda event: self.fit())
+        self.canvas.bind("<MouseWheel>", lambda event: self._zoom(event, 1.25 if event.delta > 0 else 0.8))
+        self.canvas.bind("<Button-4>", lambda event: self._zoom(event, 1.25))
+        self.canvas.bind("<Button-5>", lambda event: self._zoom(event, 0.8))
+        self.canvas.bind("<Configure>", lambda event: self._schedule())
+    
+    def show(self, tree):
+        """Lay out a whole tree and fit it to the view"""
+        self.tree = tree
+        start = time.perf_counter()
+        self.layout.build(tree.root if tree is not None else None)
+        self._layout_note = f"full layout of {len(self.layout.info)} nodes in {(time.perf_counter() - start) * 1000:.1f} ms"
+        self.fit()
+    
+    def prepare(self, key):
+        """Record the search path for key before the tree is changed"""
+        self._path = self.layout.path(key) if self.tree is not None else None
+    
+    def refresh(self):
+        """Relayout what changed since prepare() and redraw"""
+        if self.tree is None:
+            return
+        start = time.perf_counter()
+        if self._path is None:
+            self.layout.build(self.tree.root)
+            placed = len(self.layout.info)
+        else:
+            placed = self.layout.update(self.tree.root, self._path)
+        self._path = None
+        self._layout_note = f"relaid out {placed} nodes in {(time.perf_counter() - start) * 1000:.1f} ms"
+        self._schedule()
+    
+    def fit(self):
+        root = self.layout.root
+        width = max(self.canvas.winfo_width(), 200)
+        if root is None:
+            self.scale = 1.0
+        else:
+            self.scale = min(1.0, (width - 2 * MARGIN_PX) / (self.layout.info[root][0] * SLOT_PX))
+        self.offset_x = -MARGIN_PX
+        self.offset_y = 0.0
+        self._schedule()
+    
+    # Interaction
+    def _start_drag(self, event):
+        self._drag = (event.x, event.y)
+    
+    def _drag_to(self, event):
+        if self._drag is not None:
+            self.offset_x -= event.x - self._drag[0]
+            self.offset_y -= event.y - self._drag[1]
+            self._drag = (event.x, event.y)
+            self._schedule()
+    
+    def _zoom(self, event, factor):
+        old_slot, old_level = self._slot_px(), self._level_px()
+        self.scale = min(max(self.scale * factor, 1e-6), 4.0)
+        # Keep the point under the cursor in place
+        self.offset_x = (event.x + self.offset_x) / old_slot * self._slot_px() - event.x
+        self.offset_y = (event.y + self.offset_y) / old_level * self._level_px() - event.y
+        self._schedule()
+    
+    def _slot_px(self):
+        return SLOT_PX * self.scale
+    
+    def _level_px(self):
+        return max(LEVEL_PX * self.scale, MIN_LEVEL_PX)
+    
+    def _schedule(self):
+        # Collapse bursts of drag and wheel events into one redraw
+        if self._pending is None:
+            self._pending = self.after_idle(self.redraw)
+    
+    # Drawing
+    def redraw(self):
+        self._pending = None
+        c = self.canvas
+        c.delete("all")
+        root = self.tree.root if self.tree is not None else None
+        info = self.layout.info
+        if root is None or root not in info:
+            self.status.configure(text="Empty tree")
+            return
+        start = time.perf_counter()
+        view_w, view_h = c.winfo_width(), c.winfo_height()
+        slot, level = self._slot_px(), self._level_px()
+        radius = max(2.0, min(14.0, slot * 0.4))
+        labels = slot >= LABEL_PX
+        is_23 = hasattr(root, 'children')
+        colored = hasattr(root, 'color')
+        drawn = summaries = 0
+        
+        stack = [(root, 0.0, 0, None)]  # node, left slot, depth, parent position
+        while stack:
+            node, left, depth, parent_xy = stack.pop()
+            width, center, count, _ = info[node]
+            x0 = left * slot - self.offset_x
+            x1 = x0 + width * slot
+            y = MARGIN_PX + depth * level - self.offset_y
+            if x1 < 0 or x0 > view_w or y - radius > view_h:
+                continue
+            x = x0 + center * slot
+            if parent_xy is not None:
+                c.create_line(parent_xy[0], parent_xy[1], x, y, fill="#9a9a9a")
+            kids = _children(node)
+            if kids and width * slot < SUMMARY_PX:
+                # Collapsed subtree: one triangle, labelled with its key count when there is room
+                c.create_polygon(x, y - radius, max(x0, x - level), y + level * 0.6,
+                                 min(x1, x + level), y + level * 0.6,
+                                 fill="#dde6f2", outline="#7f96b2", tags="node")
+                if level >= 2 * LABEL_PX:
+                    c.create_text(x, y + level * 0.35, text=str(count), font=("Courier", 8), tags="node")
+                summaries += 1
+                continue
+            drawn += 1
+            if is_23:
+                half = radius * max(len(node.keys), 1)
+                c.create_rectangle(x - half, y - radius, x + half, y + radius,
+                                   fill="#fff4d6", outline="#b08a2e", tags="node")
+                text = "|".join(str(k) for k in node.keys)
+            else:
+                fill = "#e8f1fb"
+                if colored:
+                    fill = "#f4c7c3" if node.color == "RED" else "#cfcfcf"
+                c.create_oval(x - radius, y - radius, x + radius, y + radius,
+                              fill=fill, outline="#44546a", tags="node")
+                text = str(node.key)
+            if labels:
+                c.create_text(x, y, text=text, font=("Courier", 9), tags="node")
+            if y + level - radius > view_h:
+                continue
+            if is_23:
+                child_left = left
+                for child in node.children:
+                    if child is not None:
+                        stack.append((child, child_left, depth + 1, (x, y + radius)))
+                        child_left += info[child][0]
+            else:
+                if node.left is not None:
+                    stack.append((node.left, left, depth + 1, (x, y + radius)))
+                if node.right is not None:
+                    right_left = left + (info[node.left][0] if node.left is not None else GAP)
+                    stack.append((node.right, right_left, depth + 1, (x, y + radius)))
+        c.tag_raise("node")
+        elapsed = (time.perf_counter() - start) * 1000
+        self.status.configure(text=f"{info[root][2]} keys, {drawn} nodes and {summaries} summaries drawn "
+                                   f"in {elapsed:.1f} ms; {self._layout_note}; zoom {self.scale:.3g}")
@@ -1,20 +1,35 @@
 """
 GUI for Tree Simulator
 """
+import os
+import sqlite3
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import time
 from tree_simulator import *
+from tree_latency import LatencyRecorder
+from tree_canvas import TreeCanvas
+from tree_memory import deep_size, measure_workload, format_memory
+from tree_history import HistoryStore, DEFAULT_PATH as DEFAULT_HISTORY
+try:
+    import tree_arrays
+except ImportError:  # NumPy is optional; fall back to the tree walks
+    tree_arrays = None
+
+TEXT_VIEW_LIMIT = 2000  # larger trees are only drawn on the canvas
 
 class TreeGUI:
     def __init__(self, root):
         self.root = root
-        self.root.title("Tree Simulator - BST, RB, AVL, Splay, 2-3 Trees")
+        self.root.title("Tree Simulator - BST, RB, AVL, Splay, 2-3, Treap, Scapegoat, WAVL, Skip List")
         self.root.geometry("1200x800")
         
         self.current_tree = None
         self.current_tree_name = ""
         self.test_data = []
+        self.workload = ""  # name of the loaded data, for the run history
+        self.latency = {}
+        self.run_latency = None  # operations on the current tree only
         
         self.setup_ui()
     
@@ -32,11 +47,15 @@ class TreeGUI:
                  ("Red-Black Tree", "RBTree"),
                  ("AVL Tree", "AVLTree"),
                  ("Splay Tree", "SplayTree"),
-                 ("2-3 Tree", "Tree23")]
+                 ("2-3 Tree", "Tree23"),
+                 ("Treap", "Treap"),
+                 ("Scapegoat Tree", "ScapegoatTree"),
+                 ("WAVL Tree", "WAVLTree"),
+                 ("Skip List", "SkipList")]
         
         for i, (label, value) in enumerate(trees):
             ttk.Radiobutton(tree_frame, text=label, variable=self.tree_var, 
-                           value=value).grid(row=0, column=i, padx=5)
+                           value=value).grid(row=i // 5, column=i % 5, padx=5, sticky=tk.W)
         
         # Test case selection
         case_frame = ttk.LabelFrame(main_frame, text="Select Test Case", padding="10")
@@ -50,6 +69,8 @@ class TreeGUI:
                   command=lambda: self.load_case(3)).grid(row=0, column=2, padx=5)
         ttk.Button(case_frame, text="Custom Input", 
                   command=self.custom_input).grid(row=0, column=3, padx=5)
+        ttk.Button(case_frame, text="Load Key File", 
+                  command=self.load_file).grid(row=0, column=4, padx=5)
         
         # Operations
         op_frame = ttk.LabelFrame(main_frame, text="Operations", padding="10")
@@ -65,13 +86,19 @@ class TreeGUI:
                   command=self.delete_parent_two).grid(row=0, column=3, padx=5)
         ttk.Button(op_frame, text="Save to Files", 
                   command=self.save_to_files).grid(row=0, column=4, padx=5)
+        ttk.Button(op_frame, text="Memory Report", 
+                  command=self.memory_report).grid(row=0, column=5, padx=5)
         
         # Tree visualization
         viz_frame = ttk.LabelFrame(main_frame, text="Tree Structure", padding="10")
         viz_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5, padx=(0, 5))
         
-        self.tree_text = scrolledtext.ScrolledText(viz_frame, width=60, height=30, font=("Courier", 9))
-        self.tree_text.pack(fill=tk.BOTH, expand=True)
+        views = ttk.Notebook(viz_frame)
+        views.pack(fill=tk.BOTH, expand=True)
+        self.tree_text = scrolledtext.ScrolledText(views, width=60, height=30, font=("Courier", 9))
+        views.add(self.tree_text, text="Text")
+        self.canvas_view = TreeCanvas(views)
+        views.add(self.canvas_view, text="Canvas")
         
         # Info panel
         info_frame = ttk.LabelFrame(main_frame, text="Information & Logs", padding="10")
@@ -94,11 +121,76 @@ class TreeGUI:
         self.info_text.insert(tk.END, message + "\n")
         self.info_text.see(tk.END)
     
+    def show_tree(self, full=False):
+        """Refresh the text and canvas views; full lays the canvas out from scratch"""
+        size = sum(self.current_tree.depth_histogram())
+        self.tree_text.delete(1.0, tk.END)
+        if size > TEXT_VIEW_LIMIT:
+            self.tree_text.insert(1.0, f"{size} keys are too many for the text view, see the Canvas tab")
+        else:
+            self.tree_text.insert(1.0, self.current_tree.to_string())
+        if full:
+            self.canvas_view.show(self.current_tree)
+        else:
+            self.canvas_view.refresh()
+    
+    def classify_nodes(self):
+        """Leaf, parent, one-child and two-child keys of the current tree"""
+        if tree_arrays is not None:
+            nodes = tree_arrays.classify(self.current_tree)
+            return nodes["leaves"], nodes["parents"], nodes["parents_one"], nodes["parents_two"]
+        return (self.current_tree.find_leaf_nodes(),
+                self.current_tree.find_parent_nodes(),
+                self.current_tree.find_parents_with_one_child(),
+                self.current_tree.find_parents_with_two_children())
+    
+    def log_shape(self):
+        """Show height and depth statistics of the current tree"""
+        tree = self.current_tree
+        self.log(f"Height: {tree.height()}, Average depth: {tree.average_depth():.2f}, "
+                 f"Max imbalance: {tree.max_imbalance()}")
+        self.log(f"Keys per depth: {tree.depth_histogram()}")
+    
+    def log_latency(self):
+        """Show latency percentiles recorded so far for the current tree type"""
+        recorder = self.latency.get(self.current_tree_name)
+        if recorder:
+            self.log(f"\nLatency ({self.current_tree_name}, all runs):")
+            self.log(recorder.format_table())
+    
+    def memory_lines(self):
+        """Deep size breakdown of the current tree"""
+        deep = deep_size(self.current_tree)
+        return [f"Nodes: {deep['nodes']}, Keys: {deep['keys']}",
+                f"Structure: {deep['structure_bytes']} bytes "
+                f"({deep['bytes_per_node']:.1f} per node, {deep['bytes_per_key']:.1f} per key)",
+                f"  - Node objects: {deep['node_bytes']} bytes",
+                f"  - Lists: {deep['list_bytes']} bytes, of which {deep['list_overhead_bytes']} "
+                f"headers and spare capacity",
+                f"  - Empty None child slots: {deep['none_slots']} ({deep['none_slot_bytes']} bytes)",
+                f"  - Other per-node values: {deep['owned_value_bytes']} bytes",
+                f"Key objects: {deep['key_bytes']} bytes"]
+    
+    def memory_report(self):
+        """Log the memory footprint of the current tree and of building it again under tracemalloc"""
+        if not self.current_tree:
+            messagebox.showwarning("Warning", "Please build a tree first!")
+            return
+        
+        self.log(f"\n{'='*50}")
+        self.log(f"Memory report: {self.current_tree_name}")
+        for line in self.memory_lines():
+            self.log(line)
+        report = measure_workload(TREE_TYPES[self.current_tree_name], self.test_data)
+        self.log("\nBuild from the test data, then delete half (tracemalloc):")
+        self.log(format_memory({self.current_tree_name: report}))
+    
     def load_case(self, case_num):
         """Load test case data"""
         case1, case2, case3 = generate_test_cases()
         cases = {1: case1, 2: case2, 3: case3}
         self.test_data = cases[case_num]
+        self.workload = f"case{case_num}"
         self.log(f"Loaded Case {case_num}: {len(self.test_data)} numbers")
         self.log(f"First 10 numbers: {self.test_data[:10]}")
     
@@ -109,10 +201,32 @@ class TreeGUI:
         if input_str:
             try:
                 self.test_data = [int(x) for x in input_str.split()]
+                self.workload = "custom"
                 self.log(f"Loaded custom data: {len(self.test_data)} numbers")
             except ValueError:
                 messagebox.showerror("Error", "Invalid input. Please enter numbers only.")
     
+    def load_file(self):
+        """Load keys from a text, raw int64 or .npy file"""
+        path = filedialog.askopenfilename(title="Load Key File",
+                                          filetypes=[("Key files", "*.txt *.npy *.bin *.i64 *.int64 *.raw"),
+                                                     ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            from tree_loader import load_keys
+        except ImportError:
+            messagebox.showerror("Error", "Loading key files requires NumPy (pip install numpy).")
+            return
+        try:
+            self.test_data = load_keys(path).tolist()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not load {path}:\n{e}")
+            return
+        self.workload = os.path.basename(path)
+        self.log(f"Loaded {len(self.test_data)} numbers from {path}")
+        self.log(f"First 10 numbers: {self.test_data[:10]}")
+    
     def build_tree(self):
         """Build the selected tree with test data"""
         if not self.test_data:
@@ -120,25 +234,22 @@ class TreeGUI:
             return
         
         tree_type = self.tree_var.get()
-        tree_classes = {
-            "BST": BST,
-            "RBTree": RBTree,
-            "AVLTree": AVLTree,
-            "SplayTree": SplayTree,
-            "Tree23": Tree23
-        }
         
         self.log(f"\n{'='*50}")
         self.log(f"Building {tree_type}...")
         
-        tree_class = tree_classes[tree_type]
+        tree_class = TREE_TYPES[tree_type]
         self.current_tree = tree_class()
         self.current_tree_name = tree_type
+        recorder = self.latency.setdefault(tree_type, LatencyRecorder())
+        recorder.attach(self.current_tree)
+        self.run_latency = LatencyRecorder()
+        self.run_latency.attach(self.current_tree)
         
         # Time insertion with high precision
+        # insert_many switches to finger insertion inside sorted runs
         start = time.perf_counter()
-        for key in self.test_data:
-            self.current_tree.insert(key)
+        self.current_tree.insert_many(self.test_data)
         insert_time = time.perf_counter() - start
         
         # Display timing with appropriate units
@@ -156,15 +267,10 @@ class TreeGUI:
             self.log(f"Average time per node: {avg_time*1000:.3f} milliseconds")
         
         # Display tree
-        tree_str = self.current_tree.to_string()
-        self.tree_text.delete(1.0, tk.END)
-        self.tree_text.insert(1.0, tree_str)
+        self.show_tree(full=True)
         
         # Display node info
-        leaves = self.current_tree.find_leaf_nodes()
-        parents = self.current_tree.find_parent_nodes()
-        parents_one = self.current_tree.find_parents_with_one_child()
-        parents_two = self.current_tree.find_parents_with_two_children()
+        leaves, parents, parents_one, parents_two = self.classify_nodes()
         
         if hasattr(self.current_tree.root, 'key'):
             root_key = self.current_tree.root.key
@@ -174,10 +280,12 @@ class TreeGUI:
             root_key = None
         
         self.log(f"\nRoot Node: {root_key}")
+        self.log_shape()
         self.log(f"Leaf Nodes ({len(leaves)}): {sorted(leaves)[:20]}{'...' if len(leaves) > 20 else ''}")
         self.log(f"Parent Nodes ({len(parents)}): {sorted(parents)[:20]}{'...' if len(parents) > 20 else ''}")
         self.log(f"  - Parents with 1 child ({len(parents_one)}): {sorted(parents_one)[:20]}{'...' if len(parents_one) > 20 else ''}")
         self.log(f"  - Parents with 2 children ({len(parents_two)}): {sorted(parents_two)[:20]}{'...' if len(parents_two) > 20 else ''}")
+        self.log_latency()
         
         # Store timing info
         self.insert_time = insert_time
@@ -188,7 +296,7 @@ class TreeGUI:
             messagebox.showwarning("Warning", "Please build a tree first!")
             return
         
-        leaves = self.current_tree.find_leaf_nodes()
+        leaves = self.classify_nodes()[0]
         if not leaves:
             messagebox.showinfo("Info", "No leaf nodes found!")
             return
@@ -207,6 +315,7 @@ class TreeGUI:
         self.log(f"Operation: DELETE LEAF NODE")
         self.log(f"Node to delete: {key}")
         
+        self.canvas_view.prepare(key)
         start = time.perf_counter()
         success = self.current_tree.delete(key)
         delete_time = time.perf_counter() - start
@@ -222,19 +331,16 @@ class TreeGUI:
             self.log(f"Node {key} (leaf) deleted successfully")
             
             # Update display
-            tree_str = self.current_tree.to_string()
-            self.tree_text.delete(1.0, tk.END)
-            self.tree_text.insert(1.0, tree_str)
+            self.show_tree()
             
             # Update node info
-            leaves = self.current_tree.find_leaf_nodes()
-            parents = self.current_tree.find_parent_nodes()
-            parents_one = self.current_tree.find_parents_with_one_child()
-            parents_two = self.current_tree.find_parents_with_two_children()
+            leaves, parents, parents_one, parents_two = self.classify_nodes()
             self.log(f"Remaining leaf nodes: {len(leaves)}")
             self.log(f"Remaining parent nodes: {len(parents)}")
             self.log(f"  - Parents with 1 child: {len(parents_one)}")
             self.log(f"  - Parents with 2 children: {len(parents_two)}")
+            self.log_shape()
+            self.log_latency()
         else:
             self.log("Deletion failed!")
     
@@ -253,6 +359,7 @@ class TreeGUI:
         self.log(f"Operation: DELETE PARENT NODE (1 CHILD)")
         self.log(f"Node to delete: {key}")
         
+        self.canvas_view.prepare(key)
         start = time.perf_counter()
         success = self.current_tree.delete(key)
         delete_time = time.perf_counter() - start
@@ -267,9 +374,9 @@ class TreeGUI:
                 self.log(f"Deletion completed in {delete_time*1000:.3f} milliseconds")
             self.log(f"Node {key} (parent with 1 child) deleted successfully")
             
-            tree_str = self.current_tree.to_string()
-            self.tree_text.delete(1.0, tk.END)
-            self.tree_text.insert(1.0, tree_str)
+            self.show_tree()
+            self.log_shape()
+            self.log_latency()
         else:
             self.log("Deletion failed!")
     
@@ -288,6 +395,7 @@ class TreeGUI:
         self.log(f"Operation: DELETE PARENT NODE (2 CHILDREN)")
         self.log(f"Node to delete: {key}")
         
+        self.canvas_view.prepare(key)
         start = time.perf_counter()
         success = self.current_tree.delete(key)
         delete_time = time.perf_counter() - start
@@ -302,9 +410,9 @@ class TreeGUI:
                 self.log(f"Deletion completed in {delete_time*1000:.3f} milliseconds")
             self.log(f"Node {key} (parent with 2 children) deleted successfully")
             
-            tree_str = self.current_tree.to_string()
-            self.tree_text.delete(1.0, tk.END)
-            self.tree_text.insert(1.0, tree_str)
+            self.show_tree()
+            self.log_shape()
+            self.log_latency()
         else:
             self.log("Deletion failed!")
     
@@ -329,13 +437,13 @@ class TreeGUI:
             f.write("="*60 + "\n\n")
             f.write(f"Insertion Time: {self.insert_time:.6f} seconds\n")
             f.write(f"Average time per insertion: {self.insert_time/len(self.test_data):.8f} seconds\n")
+            f.write("\nLatency Percentiles (all runs per tree type):\n")
+            for name, recorder in self.latency.items():
+                f.write(f"\n{name}\n{recorder.format_table()}\n")
             f.write("\nNote: Perform deletion operations and check logs for deletion times\n")
         
         # File 3: Node information
-        leaves = self.current_tree.find_leaf_nodes()
-        parents = self.current_tree.find_parent_nodes()
-        parents_one = self.current_tree.find_parents_with_one_child()
-        parents_two = self.current_tree.find_parents_with_two_children()
+        leaves, parents, parents_one, parents_two = self.classify_nodes()
         
         if hasattr(self.current_tree.root, 'key'):
             root_key = self.current_tree.root.key
@@ -348,6 +456,11 @@ class TreeGUI:
             f.write(f"Tree Type: {self.current_tree_name}\n")
             f.write("="*60 + "\n\n")
             f.write(f"ROOT NODE:\n{root_key}\n\n")
+            f.write(f"HEIGHT: {self.current_tree.height()}\n")
+            f.write(f"AVERAGE DEPTH: {self.current_tree.average_depth():.4f}\n")
+            f.write(f"MAX IMBALANCE: {self.current_tree.max_imbalance()}\n")
+            f.write(f"KEYS PER DEPTH: {self.current_tree.depth_histogram()}\n\n")
+            f.write("MEMORY:\n" + "\n".join(self.memory_lines()) + "\n\n")
             f.write(f"LEAF NODES ({len(leaves)}):\n")
             f.write(f"{sorted(leaves)}\n\n")
             f.write(f"PARENT NODES ({len(parents)}):\n")
@@ -364,6 +477,15 @@ class TreeGUI:
         self.log("- timing_info.txt")
         self.log("- node_info.txt")
         
+        # The text files are overwritten every time, so keep the run in the history as well
+        try:
+            with HistoryStore() as history:
+                run_id = history.record_run(self.current_tree_name, self.workload or "unknown", len(self.test_data),
+                                            None, self.run_latency, {"insert_total_s": self.insert_time}, source="gui")
+            self.log(f"- run {run_id} added to {DEFAULT_HISTORY}")
+        except sqlite3.Error as e:
+            self.log(f"Could not record the run in {DEFAULT_HISTORY}: {e}")
+        
         messagebox.showinfo("Success", "Files saved successfully!")
 
 def main():
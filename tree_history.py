@@ -0,0 +1,219 @@
+"""
+Benchmark history - every run's latency histograms in a local SQLite file, and a check that
+flags slowdowns of the latest run against a rolling baseline
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from tree_latency import LatencyHistogram, format_ns
+
+DEFAULT_PATH = "tree_history.db"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    source TEXT NOT NULL,
+    tree TEXT NOT NULL,
+    workload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    seed INTEGER,
+    host TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    git_rev TEXT,
+    totals TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_source_series ON runs (source, tree, workload, size, id);
+CREATE TABLE IF NOT EXISTS latencies (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    op TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    p50_ns INTEGER NOT NULL,
+    p99_ns INTEGER NOT NULL,
+    histogram TEXT NOT NULL,
+    PRIMARY KEY (run_id, op)
+);
+"""
+
+def machine_info():
+    """What the timings depend on besides the code"""
+    return {"host": socket.gethostname(), "platform": platform.platform(), "machine": platform.machine(),
+            "processor": platform.processor(), "cpus": os.cpu_count(),
+            "python": platform.python_implementation() + " " + platform.python_version()}
+
+def code_version():
+    """git commit of this checkout, with -dirty when there are local changes; None outside git"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here, capture_output=True,
+                             text=True, timeout=10, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True, timeout=10, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return rev + ("-dirty" if dirty else "")
+
+class HistoryStore:
+    """Runs and their latency histograms in a SQLite file"""
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+        self._context = None  # (machine info, git revision), looked up once on the first record
+    
+    def close(self):
+        self.db.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def record_run(self, tree, workload, size, seed, recorder, totals=None, source="benchmark"):
+        """Store one run of a tree type on a workload with the LatencyRecorder that timed it; returns the run id"""
+        if self._context is None:
+            self._context = machine_info(), code_version()
+        machine, git_rev = self._context
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT INTO runs (created, source, tree, workload, size, seed, host, machine, git_rev, totals) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now(timezone.utc).isoformat(timespec="seconds"), source, tree, workload, size, seed,
+                 machine["host"], json.dumps(machine), git_rev, json.dumps(totals or {})))
+            run_id = cursor.lastrowid
+            for op, histogram in recorder.histograms.items():
+                if histogram.count:
+                    self.db.execute(
+                        "INSERT INTO latencies (run_id, op, count, p50_ns, p99_ns, histogram) VALUES (?, ?, ?, ?, ?, ?)",
+                        (run_id, op, histogram.count, histogram.percentile(50), histogram.percentile(99),
+                         json.dumps(histogram.to_dict())))
+        return run_id
+    
+    def runs(self, tree=None, workload=None, limit=50):
+        """Most recent runs first, as dicts"""
+        query, args = "SELECT * FROM runs", []
+        filters = [(column, value) for column, value in (("tree", tree), ("workload", workload)) if value]
+        if filters:
+            query += " WHERE " + " AND ".join(f"{column} = ?" for column, _ in filters)
+            args = [value for _, value in filters]
+        query += " ORDER BY id DESC LIMIT ?"
+        return [dict(row) for row in self.db.execute(query, args + [limit])]
+    
+    def histograms(self, run_id):
+        """op -> LatencyHistogram for a run"""
+        rows = self.db.execute("SELECT op, histogram FROM latencies WHERE run_id = ?", (run_id,))
+        return {row["op"]: LatencyHistogram.from_dict(json.loads(row["histogram"])) for row in rows}
+    
+    def check_regressions(self, window=5, spread=3.0, min_slowdown=0.05, same_machine=True, min_runs=3):
+        """Compare the latest run of every (source, tree, workload, size) series with the runs before it.
+        
+        Each run is one sample: the operations inside a run share its machine
+        state, so they are not independent of each other. The baseline is the
+        median of the operation's medians in up to window earlier runs (from
+        the same host unless same_machine is off), and the noise is their
+        median absolute deviation scaled to a standard deviation. An operation
+        is flagged when the latest median is at least min_slowdown above the
+        baseline, more than spread times the noise above it, and above every
+        baseline run's median. With fewer than min_runs baseline runs the
+        series is reported but never flagged.
+        """
+        findings = []
+        series = self.db.execute("SELECT source, tree, workload, size, MAX(id) AS latest FROM runs "
+                                 "GROUP BY source, tree, workload, size "
+                                 "ORDER BY source, tree, workload, size").fetchall()
+        for source, tree, workload, size, latest in series:
+            host = self.db.execute("SELECT host FROM runs WHERE id = ?", (latest,)).fetchone()["host"]
+            query = "SELECT id FROM runs WHERE source = ? AND tree = ? AND workload = ? AND size = ? AND id < ?"
+            args = [source, tree, workload, size, latest]
+            if same_machine:
+                query += " AND host = ?"
+                args.append(host)
+            baseline_ids = [row["id"] for row in self.db.execute(query + " ORDER BY id DESC LIMIT ?", args + [window])]
+            if not baseline_ids:
+                continue
+            run_medians = {}
+            for run_id in baseline_ids:
+                for op, histogram in self.histograms(run_id).items():
+                    run_medians.setdefault(op, []).append(histogram.percentile(50))
+            for op, histogram in self.histograms(latest).items():
+                if op not in run_medians:
+                    continue
+                medians = run_medians[op]
+                median, base_median = histogram.percentile(50), statistics.median(medians)
+                noise = 1.4826 * statistics.median(abs(m - base_median) for m in medians)
+                slowdown = median / base_median - 1 if base_median else 0.0
+                # All baseline medians can land in one histogram bucket, leaving no measurable noise
+                score = (median - base_median) / noise if noise else None
+                findings.append({"source": source, "tree": tree, "workload": workload, "size": size, "op": op,
+                                 "run": latest, "baseline_runs": len(medians), "p50_ns": median,
+                                 "baseline_p50_ns": base_median, "baseline_run_p50_ns": medians,
+                                 "noise_ns": noise, "slowdown": slowdown, "score": score,
+                                 "regression": (len(medians) >= min_runs and slowdown >= min_slowdown
+                                                and median > max(medians)
+                                                and (score is None or score > spread))})
+        return findings
+
+def format_runs(runs):
+    lines = [f"{'id':>5}  {'created':<27}{'source':<11}{'tree':<15}{'workload':<10}{'size':>8}  rev"]
+    for r in runs:
+        lines.append(f"{r['id']:>5}  {r['created']:<27}{r['source']:<11}{r['tree']:<15}{r['workload']:<10}"
+                     f"{r['size']:>8}  {r['git_rev'] or '-'}")
+    return "\n".join(lines)
+
+def format_findings(findings):
+    lines = [f"{'source':<11}{'tree':<15}{'workload':<10}{'size':>8} {'op':<8}{'p50':>10}{'base p50':>10}"
+             f"{'change':>9}{'x noise':>8}"]
+    for f in findings:
+        score = "-" if f["score"] is None else f"{f['score']:.1f}"
+        lines.append(f"{f['source']:<11}{f['tree']:<15}{f['workload']:<10}{f['size']:>8} {f['op']:<8}"
+                     f"{format_ns(f['p50_ns']):>10}{format_ns(f['baseline_p50_ns']):>10}{f['slowdown']:>+9.1%}"
+                     f"{score:>8}  {'REGRESSION' if f['regression'] else ''}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run history and regression check")
+    parser.add_argument("--db", default=DEFAULT_PATH, help="SQLite history file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="show recorded runs")
+    listing.add_argument("--tree")
+    listing.add_argument("--workload")
+    listing.add_argument("--limit", type=int, default=50)
+    check = commands.add_parser("check", help="compare the latest run of each series with a rolling baseline")
+    check.add_argument("--window", type=int, default=5, help="earlier runs in the baseline")
+    check.add_argument("--spread", type=float, default=3.0,
+                       help="how many times the run-to-run noise a slowdown must exceed")
+    check.add_argument("--min-runs", type=int, default=3, help="fewest baseline runs needed to flag anything")
+    check.add_argument("--min-slowdown", type=float, default=0.05, help="smallest median slowdown to flag")
+    check.add_argument("--any-machine", action="store_true", help="also use baseline runs from other hosts")
+    check.add_argument("--json", help="write the findings to this JSON file")
+    args = parser.parse_args()
+    
+    with HistoryStore(args.db) as history:
+        if args.command == "list":
+            print(format_runs(history.runs(args.tree, args.workload, args.limit)))
+            return
+        findings = history.check_regressions(args.window, args.spread, args.min_slowdown, not args.any_machine,
+                                             args.min_runs)
+    if not findings:
+        print("No series has both a latest run and a baseline yet")
+    else:
+        print(format_findings(findings))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(findings, f, indent=2)
+    regressions = sum(f["regression"] for f in findings)
+    if regressions:
+        print(f"\n{regressions} regression(s) found")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
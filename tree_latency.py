@@ -0,0 +1,153 @@
+"""
+Latency recording for Tree Simulator - log-bucketed histograms with tail percentiles
+"""
+import time
+
+OPERATIONS = ("insert", "delete", "search")
+PERCENTILES = (50, 90, 99, 99.9)
+
+class LatencyHistogram:
+    """HDR-style histogram of nanosecond latencies.
+    
+    Values below 2**sub_bucket_bits are counted exactly; above that every
+    power-of-two range is split into 2**(sub_bucket_bits - 1) equal buckets,
+    so the relative error stays below 2**-(sub_bucket_bits - 1) and the
+    memory used is fixed no matter how many values are recorded.
+    """
+    def __init__(self, sub_bucket_bits=7, max_bits=40):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.max_value = (1 << max_bits) - 1
+        self.counts = [0] * self._index(self.max_value) + [0]
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+    
+    def _index(self, value):
+        if value < (1 << self.sub_bucket_bits):
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return shift * self.half + (value >> shift)
+    
+    def _highest_equivalent(self, index):
+        if index < (1 << self.sub_bucket_bits):
+            return index
+        shift = index // self.half - 1
+        mantissa = index - shift * self.half
+        return ((mantissa + 1) << shift) - 1
+    
+    def record(self, value):
+        """Record one latency in nanoseconds"""
+        if value < 0:
+            value = 0
+        elif value > self.max_value:
+            value = self.max_value
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+    
+    def merge(self, other):
+        """Add all values recorded in another histogram of the same shape"""
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+    
+    def percentile(self, p):
+        """Value (ns) at or below which p percent of the recorded values fall"""
+        if self.count == 0:
+            return 0
+        target = max(1, -(-self.count * p // 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self._highest_equivalent(i), self.max)
+        return self.max
+    
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+    
+    def to_dict(self):
+        """JSON-ready form that keeps only the non-empty buckets"""
+        return {"sub_bucket_bits": self.sub_bucket_bits, "max_bits": self.max_value.bit_length(),
+                "count": self.count, "total": self.total, "min": self.min, "max": self.max,
+                "counts": {str(i): c for i, c in enumerate(self.counts) if c}}
+    
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["sub_bucket_bits"], data["max_bits"])
+        for i, c in data["counts"].items():
+            histogram.counts[int(i)] = c
+        histogram.count, histogram.total = data["count"], data["total"]
+        histogram.min, histogram.max = data["min"], data["max"]
+        return histogram
+    
+    def summary(self):
+        """Count, mean, p50/p90/p99/p99.9 and max in nanoseconds"""
+        result = {"count": self.count, "mean_ns": round(self.mean(), 1),
+                  "min_ns": self.min or 0}
+        for p in PERCENTILES:
+            result[f"p{p:g}_ns"] = self.percentile(p)
+        result["max_ns"] = self.max
+        return result
+
+class LatencyRecorder:
+    """Times every insert, delete and search made on the attached trees"""
+    def __init__(self):
+        self.histograms = {op: LatencyHistogram() for op in OPERATIONS}
+    
+    def attach(self, tree):
+        """Wrap the tree's public operations so each call is recorded"""
+        tree.add_hook(self._hook)
+        return tree
+    
+    def detach(self, tree):
+        tree.remove_hook(self._hook)
+        return tree
+    
+    def _hook(self, op, method):
+        histogram = self.histograms[op]
+        clock = time.perf_counter_ns
+        def timed(key):
+            start = clock()
+            result = method(key)
+            histogram.record(clock() - start)
+            return result
+        return timed
+    
+    def merge(self, other):
+        for op in OPERATIONS:
+            self.histograms[op].merge(other.histograms[op])
+    
+    def summary(self):
+        return {op: h.summary() for op, h in self.histograms.items() if h.count}
+    
+    def format_table(self):
+        """Plain text table of the recorded percentiles"""
+        lines = [f"{'op':<8}{'count':>9}{'p50':>11}{'p90':>11}{'p99':>11}{'p99.9':>11}{'max':>11}"]
+        for op, h in self.histograms.items():
+            if not h.count:
+                continue
+            cells = [format_ns(h.percentile(p)) for p in PERCENTILES] + [format_ns(h.max)]
+            lines.append(f"{op:<8}{h.count:>9}" + "".join(f"{c:>11}" for c in cells))
+        return "\n".join(lines)
+
+def format_ns(ns):
+    """Human readable duration for a nanosecond value"""
+    if ns < 1000:
+        return f"{ns}ns"
+    if ns < 1000000:
+        return f"{ns/1000:.1f}us"
+    if ns < 1000000000:
+        return f"{ns/1000000:.2f}ms"
+    return f"{ns/1000000000:.2f}s"
@@ -0,0 +1,133 @@
+"""
+Streaming key loader - feeds text, raw int64 and .npy key files into the trees
+"""
+import argparse
+import os
+import time
+import warnings
+import numpy as np
+
+FORMATS = ("text", "int64", "npy")
+BINARY_SUFFIXES = (".bin", ".i64", ".int64", ".raw")
+CHUNK_KEYS = 1 << 20
+CHUNK_BYTES = 8 << 20
+_WHITESPACE = (b" ", b"\n", b"\t", b"\r")
+
+def detect_format(path):
+    """Guess the key file format from its extension"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".npy":
+        return "npy"
+    if suffix in BINARY_SUFFIXES:
+        return "int64"
+    return "text"
+
+def _parse_text(block):
+    if not block.strip():
+        # fromstring reads a block of only whitespace as a single 0
+        return np.zeros(0, dtype=np.int64)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        try:
+            keys = np.fromstring(block, dtype=np.int64, sep=" ")
+        except (ValueError, DeprecationWarning):
+            raise ValueError("Key file contains something other than whitespace separated integers") from None
+    # fromstring saturates out-of-range integers at the int64 limits, so the
+    # tokens that parsed to a limit are checked again exactly
+    info = np.iinfo(np.int64)
+    edges = np.flatnonzero((keys == info.max) | (keys == info.min))
+    if edges.size:
+        tokens = block.split()
+        for i in edges.tolist():
+            if int(tokens[i]) != keys[i]:
+                raise ValueError(f"Key {tokens[i].decode()} does not fit in int64")
+    return keys
+
+def _iter_text(path, chunk_bytes):
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = max(block.rfind(ws) for ws in _WHITESPACE)
+            if cut < 0:
+                # A single token longer than the chunk; keep reading
+                tail = block
+                continue
+            tail = block[cut + 1:]
+            keys = _parse_text(block[:cut + 1])
+            if keys.size:
+                yield keys
+    if tail.strip():
+        yield _parse_text(tail)
+
+def _iter_int64(path, chunk_keys):
+    size = os.path.getsize(path)
+    if size % 8:
+        raise ValueError(f"{path} is {size} bytes, not a whole number of int64 keys")
+    if size == 0:
+        return
+    keys = np.memmap(path, dtype="<i8", mode="r")
+    for start in range(0, keys.size, chunk_keys):
+        yield np.array(keys[start:start + chunk_keys], dtype=np.int64)
+
+def _iter_npy(path, chunk_keys):
+    keys = np.load(path, mmap_mode="r")
+    if keys.ndim != 1 or keys.dtype.kind not in "iu":
+        raise ValueError(f"{path} must hold a 1-D integer array, found {keys.dtype} with shape {keys.shape}")
+    limit = np.iinfo(np.int64).max
+    for start in range(0, keys.size, chunk_keys):
+        chunk = keys[start:start + chunk_keys]
+        if keys.dtype == np.uint64 and chunk.size and chunk.max() > limit:
+            raise ValueError(f"{path} holds uint64 key {chunk.max()}, which does not fit in int64")
+        yield np.array(chunk, dtype=np.int64)
+
+def iter_key_chunks(path, fmt=None, chunk_keys=CHUNK_KEYS, chunk_bytes=CHUNK_BYTES):
+    """Yield the keys of a file as int64 arrays without loading the whole file.
+    
+    fmt is "text" (whitespace/newline separated), "int64" (raw little-endian)
+    or "npy"; it is taken from the file extension when omitted.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == "text":
+        return _iter_text(path, chunk_bytes)
+    if fmt == "int64":
+        return _iter_int64(path, chunk_keys)
+    if fmt == "npy":
+        return _iter_npy(path, chunk_keys)
+    raise ValueError(f"Unknown key file format {fmt!r}, expected one of {FORMATS}")
+
+def load_keys(path, fmt=None):
+    """All keys of a file as one int64 array"""
+    chunks = list(iter_key_chunks(path, fmt))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+def load_into(tree, path, fmt=None):
+    """Insert the keys of a file into tree chunk by chunk; returns the key count"""
+    count = 0
+    for chunk in iter_key_chunks(path, fmt):
+        tree.insert_many(chunk.tolist())
+        count += len(chunk)
+    return count
+
+def main():
+    from tree_simulator import TREE_TYPES
+    parser = argparse.ArgumentParser(description="Build a tree from a key file")
+    parser.add_argument("path", help="key file (.txt, .npy, or raw int64: .bin/.i64/.int64/.raw)")
+    parser.add_argument("--format", choices=FORMATS, help="override the format guessed from the extension")
+    parser.add_argument("--tree", choices=list(TREE_TYPES), default="AVLTree")
+    args = parser.parse_args()
+    
+    tree = TREE_TYPES[args.tree]()
+    start = time.perf_counter()
+    count = load_into(tree, args.path, args.format)
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {count} keys into {args.tree} in {elapsed:.3f} seconds")
+    if count:
+        print(f"Average time per key: {elapsed / count * 1000000:.3f} microseconds")
+    print(f"Height: {tree.height()}, Average depth: {tree.average_depth():.2f}")
+
+if __name__ == "__main__":
+    main()
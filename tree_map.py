@@ -0,0 +1,275 @@
+"""
+Ordered key -> value maps on the trees that keep values next to their keys, a bisect-on-sorted-list
+map to compare them with, and a benchmark across map sizes
+"""
+import argparse
+import bisect
+import json
+import random
+import time
+from collections.abc import MutableMapping, ItemsView, ValuesView
+from tree_simulator import AVLTree, RBTree, SplayTree, Tree23
+
+MAP_TYPES = {"AVLTree": AVLTree, "RBTree": RBTree, "SplayTree": SplayTree, "Tree23": Tree23}
+_MISSING = object()
+
+class _OrderedMap(MutableMapping):
+    """Shared parts of the two maps: views in key order, slicing by key and setdefault"""
+    def items(self):
+        return _ItemsView(self)
+    
+    def values(self):
+        return _ValuesView(self)
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step is not None:
+                raise ValueError("Key slices do not take a step")
+            return self._slice(key.start, key.stop)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __delitem__(self, key):
+        if isinstance(key, slice):
+            if key.step is not None:
+                raise ValueError("Key slices do not take a step")
+            for k, _ in list(self._slice_items(key.start, key.stop)):
+                self.pop(k)
+            return
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+    
+    def setdefault(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self[key] = value = default
+        return value
+    
+    def _slice_items(self, start, stop):
+        """(key, value) pairs with start <= key < stop, like a list slice; None leaves a side open"""
+        for key, value in self.irange_items(start, stop):
+            if stop is not None and key == stop:
+                return
+            yield key, value
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+class _ItemsView(ItemsView):
+    def __iter__(self):
+        return self._mapping.irange_items()
+
+class _ValuesView(ValuesView):
+    def __iter__(self):
+        return (value for _, value in self._mapping.irange_items())
+
+class TreeMap(_OrderedMap):
+    """Mapping kept in key order in one of MAP_TYPES, with each value stored on its key's node.
+    
+    m[low:high] is a new map of the entries with low <= key < high, and
+    del m[low:high] removes them; irange_items(low, high) iterates over the
+    pairs with both ends included. The map owns its tree, which is only
+    changed through the map.
+    """
+    def __init__(self, items=(), tree_type="AVLTree"):
+        if tree_type not in MAP_TYPES:
+            raise ValueError(f"Unknown map tree type {tree_type!r}, expected one of {list(MAP_TYPES)}")
+        self.tree_type = tree_type
+        self.tree = MAP_TYPES[tree_type]()
+        self._len = 0
+        self.update(items)
+    
+    @classmethod
+    def from_sorted(cls, items, tree_type="AVLTree"):
+        """Map of (key, value) pairs already in strictly increasing key order, built in linear time"""
+        keys, values = [], []
+        for key, value in items:
+            if keys and not keys[-1] < key:
+                raise ValueError(f"Keys are not strictly increasing at {key!r}")
+            keys.append(key)
+            values.append(value)
+        m = cls(tree_type=tree_type)
+        m.tree._load_sorted(keys, values)
+        m._len = len(keys)
+        return m
+    
+    def __len__(self):
+        return self._len
+    
+    def __iter__(self):
+        return self.tree.keys()
+    
+    def __contains__(self, key):
+        return self.tree.get_value(key, _MISSING) is not _MISSING
+    
+    def get(self, key, default=None):
+        return self.tree.get_value(key, default)
+    
+    def __setitem__(self, key, value):
+        if self.tree.set_value(key, value):
+            self._len += 1
+    
+    def pop(self, key, default=_MISSING):
+        value = self.tree.pop_value(key, _MISSING)
+        if value is _MISSING:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        self._len -= 1
+        return value
+    
+    def irange_items(self, low=None, high=None):
+        return self.tree.items(low, high)
+    
+    def _slice(self, start, stop):
+        return TreeMap.from_sorted(self._slice_items(start, stop), self.tree_type)
+
+class SortedListMap(_OrderedMap):
+    """The same mapping on two parallel sorted lists searched with bisect; O(n) inserts and deletes"""
+    def __init__(self, items=()):
+        self._keys = []
+        self._values = []
+        self.update(items)
+    
+    @classmethod
+    def from_sorted(cls, items):
+        m = cls()
+        for key, value in items:
+            if m._keys and not m._keys[-1] < key:
+                raise ValueError(f"Keys are not strictly increasing at {key!r}")
+            m._keys.append(key)
+            m._values.append(value)
+        return m
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __iter__(self):
+        return iter(self._keys)
+    
+    def __contains__(self, key):
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+    
+    def get(self, key, default=None):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._values[i]
+        return default
+    
+    def __setitem__(self, key, value):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            self._values[i] = value
+        else:
+            self._keys.insert(i, key)
+            self._values.insert(i, value)
+    
+    def pop(self, key, default=_MISSING):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+            return self._values.pop(i)
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+    
+    def irange_items(self, low=None, high=None):
+        start = 0 if low is None else bisect.bisect_left(self._keys, low)
+        stop = len(self._keys) if high is None else bisect.bisect_right(self._keys, high)
+        return zip(self._keys[start:stop], self._values[start:stop])
+    
+    def _slice(self, start, stop):
+        low = 0 if start is None else bisect.bisect_left(self._keys, start)
+        high = len(self._keys) if stop is None else bisect.bisect_left(self._keys, stop)
+        m = SortedListMap()
+        m._keys, m._values = self._keys[low:high], self._values[low:high]
+        return m
+
+# Benchmark
+def _build(name, items):
+    if name == "SortedList":
+        return SortedListMap.from_sorted(items)
+    return TreeMap.from_sorted(items, name)
+
+def run_map_benchmark(sizes, ops=10000, span=100, names=None, seed=None):
+    """Per-operation time of each map at each size.
+    
+    Every map starts bulk-loaded with the even keys 0, 2, ... 2(n - 1).
+    Then ops random gets of stored keys, updates of stored keys, inserts of
+    new odd keys and pops of those keys again, and ops // 10 scans over span
+    consecutive keys are timed, so every phase leaves the map at size n.
+    """
+    names = names or ["SortedList"] + list(MAP_TYPES)
+    rng = random.Random(seed)
+    results = {"ops": ops, "span": span, "sizes": {}}
+    for n in sizes:
+        present = [2 * rng.randrange(n) for _ in range(ops)]
+        fresh = [2 * k + 1 for k in rng.sample(range(n), min(ops, n))]
+        starts = [2 * rng.randrange(max(n - span, 1)) for _ in range(max(ops // 10, 1))]
+        results["sizes"][n] = {}
+        for name in names:
+            start = time.perf_counter()
+            m = _build(name, ((2 * k, k) for k in range(n)))
+            result = {"build_s": time.perf_counter() - start}
+            get = m.get
+            start = time.perf_counter()
+            for key in present:
+                get(key)
+            result["get_us"] = (time.perf_counter() - start) / len(present) * 1e6
+            start = time.perf_counter()
+            for key in present:
+                m[key] = key
+            result["update_us"] = (time.perf_counter() - start) / len(present) * 1e6
+            start = time.perf_counter()
+            for key in fresh:
+                m[key] = key
+            result["insert_us"] = (time.perf_counter() - start) / len(fresh) * 1e6
+            pop = m.pop
+            start = time.perf_counter()
+            for key in fresh:
+                pop(key)
+            result["pop_us"] = (time.perf_counter() - start) / len(fresh) * 1e6
+            start = time.perf_counter()
+            for low in starts:
+                for _ in m.irange_items(low, low + 2 * (span - 1)):
+                    pass
+            result["scan_us"] = (time.perf_counter() - start) / len(starts) * 1e6
+            results["sizes"][n][name] = result
+            del m
+    return results
+
+def format_map_results(results):
+    lines = [f"{results['ops']} ops per phase, scans of {results['span']} keys",
+             f"{'size':>10} {'map':<12}{'build s':>9}{'get us':>9}{'update us':>11}{'insert us':>11}"
+             f"{'pop us':>9}{'scan us':>9}"]
+    for n, maps in results["sizes"].items():
+        for name, r in maps.items():
+            lines.append(f"{n:>10} {name:<12}{r['build_s']:>9.3f}{r['get_us']:>9.2f}{r['update_us']:>11.2f}"
+                         f"{r['insert_us']:>11.2f}{r['pop_us']:>9.2f}{r['scan_us']:>9.1f}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the tree maps with a bisect-on-sorted-list map")
+    parser.add_argument("--min-exp", type=int, default=3, help="smallest size is 10**min_exp")
+    parser.add_argument("--max-exp", type=int, default=6,
+                        help="largest size is 10**max_exp; 7 needs several GB of memory")
+    parser.add_argument("--ops", type=int, default=10000, help="operations timed per phase")
+    parser.add_argument("--span", type=int, default=100, help="keys per range scan")
+    parser.add_argument("--maps", nargs="+", choices=["SortedList"] + list(MAP_TYPES),
+                        help="maps to run (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args()
+    
+    sizes = [10 ** e for e in range(args.min_exp, args.max_exp + 1)]
+    results = run_map_benchmark(sizes, args.ops, args.span, args.maps, args.seed)
+    print(format_map_results(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
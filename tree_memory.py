@@ -0,0 +1,178 @@
+"""
+Memory footprint of the trees - tracemalloc totals and a deep size breakdown per node
+"""
+import argparse
+import json
+import random
+import struct
+import sys
+import tracemalloc
+from tree_simulator import TREE_TYPES
+
+POINTER_BYTES = struct.calcsize("P")
+OWNED_ATTRIBUTES = ("priority", "height", "rank")  # per-node numbers that may be separate objects
+_instance_bytes_cache = {}
+
+def _traced_bytes():
+    return tracemalloc.get_traced_memory()[0]
+
+def instance_bytes(cls, samples=4096):
+    """Bytes allocated for one bare instance of cls, including its attribute value storage.
+    
+    sys.getsizeof leaves out the inline attribute values, so this is measured
+    with tracemalloc on freshly allocated instances. Calibrate after at least
+    one real instance exists, since that fixes the attribute layout of the class.
+    """
+    if cls not in _instance_bytes_cache:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            holder = [None] * samples
+            before = _traced_bytes()
+            for i in range(samples):
+                holder[i] = cls.__new__(cls)
+            _instance_bytes_cache[cls] = round((_traced_bytes() - before) / samples)
+            del holder
+        finally:
+            if started:
+                tracemalloc.stop()
+    return _instance_bytes_cache[cls]
+
+def iter_nodes(tree):
+    """Every node object the tree holds, including a skip list's head"""
+    if hasattr(tree, 'head'):
+        node = tree.head
+        while node is not None:
+            yield node
+            node = node.forward[0]
+        return
+    stack = [tree.root] if tree.root is not None else []
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(tree._children(node))
+
+def _list_parts(items):
+    """(bytes, overhead bytes, None slots) of a list; overhead is the header plus spare capacity"""
+    size = sys.getsizeof(items)
+    return size, size - len(items) * POINTER_BYTES, sum(1 for item in items if item is None)
+
+def deep_size(tree):
+    """Bytes held by the tree's own objects, broken down by what they are for.
+    
+    Key objects are counted separately since the caller usually owns them
+    too; small ints are cached by the interpreter and cost nothing.
+    """
+    report = {"nodes": 0, "keys": 0, "node_bytes": 0, "list_bytes": 0, "list_overhead_bytes": 0,
+              "none_slots": 0, "none_slot_bytes": 0, "owned_value_bytes": 0, "key_bytes": 0}
+    seen_keys = set()
+    for node in iter_nodes(tree):
+        report["nodes"] += 1
+        report["node_bytes"] += instance_bytes(type(node))
+        lists = []
+        if hasattr(node, 'children'):
+            keys = node.keys
+            # Only child links are empty slots; a stored None value is data
+            lists = [(node.keys, False), (node.children, True)]
+            if node.values is not None:
+                lists.append((node.values, False))
+        else:
+            keys = [node.key] if node.key is not None else []
+            if hasattr(node, 'forward'):
+                lists = [(node.forward, True)]
+            else:
+                report["none_slots"] += (node.left is None) + (node.right is None)
+        for items, links in lists:
+            size, overhead, empty = _list_parts(items)
+            report["list_bytes"] += size
+            report["list_overhead_bytes"] += overhead
+            if links:
+                report["none_slots"] += empty
+        for attr in OWNED_ATTRIBUTES:
+            value = getattr(node, attr, None)
+            if isinstance(value, float) or (isinstance(value, int) and not -5 <= value <= 256):
+                report["owned_value_bytes"] += sys.getsizeof(value)
+        report["keys"] += len(keys)
+        for key in keys:
+            if id(key) not in seen_keys and not (isinstance(key, int) and -5 <= key <= 256):
+                seen_keys.add(id(key))
+                report["key_bytes"] += sys.getsizeof(key)
+    report["none_slot_bytes"] = report["none_slots"] * POINTER_BYTES
+    if tree._tombstones:
+        report["owned_value_bytes"] += sys.getsizeof(tree._tombstones)
+    report["structure_bytes"] = report["node_bytes"] + report["list_bytes"] + report["owned_value_bytes"]
+    report["bytes_per_node"] = report["structure_bytes"] / report["nodes"] if report["nodes"] else 0.0
+    report["bytes_per_key"] = report["structure_bytes"] / report["keys"] if report["keys"] else 0.0
+    return report
+
+def _blocks():
+    return len(tracemalloc.take_snapshot().traces)
+
+def measure_workload(tree_class, data, rng=None, delete_fraction=0.5):
+    """tracemalloc totals for building a tree from data and then deleting part of it.
+    
+    Blocks are the net number of live allocations a phase left behind; peak
+    is the highest traced memory above the starting point during the phase.
+    """
+    rng = rng or random.Random(0)
+    doomed = list(data)
+    rng.shuffle(doomed)
+    doomed = doomed[:int(len(doomed) * delete_fraction)]
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tree = tree_class()
+        tracemalloc.reset_peak()
+        blocks, base = _blocks(), _traced_bytes()
+        for key in data:
+            tree.insert(key)
+        current, peak = tracemalloc.get_traced_memory()
+        build = {"keys": len(data), "bytes": current - base, "peak_bytes": peak - base,
+                 "blocks": _blocks() - blocks,
+                 "bytes_per_key": (current - base) / len(data) if data else 0.0}
+        deep = deep_size(tree)
+        
+        tracemalloc.reset_peak()
+        blocks, base = _blocks(), _traced_bytes()
+        for key in doomed:
+            tree.delete(key)
+        current, peak = tracemalloc.get_traced_memory()
+        delete = {"keys": len(doomed), "freed_bytes": base - current, "peak_bytes": peak - base,
+                  "blocks": _blocks() - blocks}
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {"build": build, "delete": delete, "deep": deep}
+
+def format_memory(reports):
+    """Table of measure_workload results keyed by tree name"""
+    lines = [f"{'tree':<15}{'build B':>10}{'B/key':>8}{'peak B':>10}{'blocks':>8}"
+             f"{'node B':>10}{'list B':>9}{'list ovh':>9}{'None':>7}{'freed B':>10}{'del blocks':>11}"]
+    for name, r in reports.items():
+        b, d, deep = r["build"], r["delete"], r["deep"]
+        lines.append(f"{name:<15}{b['bytes']:>10}{b['bytes_per_key']:>8.1f}{b['peak_bytes']:>10}{b['blocks']:>8}"
+                     f"{deep['node_bytes']:>10}{deep['list_bytes']:>9}{deep['list_overhead_bytes']:>9}"
+                     f"{deep['none_slots']:>7}{d['freed_bytes']:>10}{d['blocks']:>11}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory footprint of each tree type")
+    parser.add_argument("--size", type=int, default=100000, help="number of random keys")
+    parser.add_argument("--trees", nargs="+", choices=list(TREE_TYPES), help="tree types to run (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    data = rng.sample(range(1 << 40), args.size)
+    reports = {name: measure_workload(TREE_TYPES[name], data, random.Random(args.seed))
+               for name in args.trees or TREE_TYPES}
+    print(format_memory(reports))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+if __name__ == "__main__":
+    main()
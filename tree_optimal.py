@@ -0,0 +1,241 @@
+"""
+Static BSTs shaped by access frequencies - exact Knuth construction for small key sets,
+Mehlhorn's weight-balancing rule for large ones
+"""
+import argparse
+import bisect
+import json
+import random
+import time
+from collections import Counter
+from tree_simulator import BST, BSTNode, AVLTree, SplayTree
+
+EXACT_LIMIT = 1000  # largest key count built with the O(n^2) Knuth table
+
+def workload_frequencies(accesses, keys=()):
+    """Access counts per key; keys that are never accessed are included with count 0"""
+    frequencies = Counter({key: 0 for key in keys})
+    frequencies.update(accesses)
+    return frequencies
+
+def trace_frequencies(path):
+    """Successful searches per key in a recorded trace, plus the keys still live at its end with count 0"""
+    from tree_trace import read_trace, OP_CODES
+    live = Counter()
+    hits = Counter()
+    for op, key, result in read_trace(path):
+        if op == OP_CODES["insert"]:
+            live[key] += 1
+        elif op == OP_CODES["delete"] and result == 1:
+            live[key] -= 1
+        elif op == OP_CODES["search"] and result == 1:
+            hits[key] += 1
+    return workload_frequencies(hits.elements(), [key for key, count in live.items() if count > 0])
+
+def trace_searches(path):
+    """Keys of the successful searches in a recorded trace, in order"""
+    from tree_trace import read_trace, OP_CODES
+    return [key for op, key, result in read_trace(path) if op == OP_CODES["search"] and result == 1]
+
+def knuth_roots(weights):
+    """Root table of the optimal BST over weights, in O(n^2) time.
+    
+    roots[i][j] is the index of the root of the optimal tree over keys
+    i..j-1. Knuth's observation that roots[i][j - 1] <= roots[i][j] <=
+    roots[i + 1][j] keeps the total work quadratic.
+    """
+    n = len(weights)
+    prefix = [0]
+    for w in weights:
+        prefix.append(prefix[-1] + w)
+    cost = [[0] * (n + 1) for _ in range(n + 1)]
+    roots = [[0] * (n + 1) for _ in range(n + 1)]
+    for i in range(n):
+        cost[i][i + 1] = weights[i]
+        roots[i][i + 1] = i
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = i + length
+            best, best_r = None, None
+            row = cost[i]
+            for r in range(roots[i][j - 1], roots[i + 1][j] + 1):
+                c = row[r] + cost[r + 1][j]
+                if best is None or c < best:
+                    best, best_r = c, r
+            cost[i][j] = best + prefix[j] - prefix[i]
+            roots[i][j] = best_r
+    return roots
+
+def _knuth_root(roots):
+    return lambda low, high: roots[low][high]
+
+def _mehlhorn_root(weights):
+    """Root picker that splits the weight of a key range as evenly as possible, O(log n) per node"""
+    prefix = [0]
+    for w in weights:
+        prefix.append(prefix[-1] + w)
+    # Key r balances low..high best when prefix[r] + prefix[r + 1] is closest to prefix[low] + prefix[high]
+    doubled = [prefix[r] + prefix[r + 1] for r in range(len(weights))]
+    
+    def root(low, high):
+        target = prefix[low] + prefix[high]
+        if prefix[high] == prefix[low]:
+            return (low + high - 1) // 2
+        r = bisect.bisect_left(doubled, target, low, high - 1)
+        if r > low and target - doubled[r - 1] <= doubled[r] - target:
+            r -= 1
+        return r
+    return root
+
+def build_optimal(frequencies, exact_limit=EXACT_LIMIT):
+    """Static BST over the keys of frequencies (a mapping of key to access count).
+    
+    Up to exact_limit keys the tree minimizes the expected search cost;
+    above that Mehlhorn's rule, which puts the weighted median of every range
+    at its root, builds a tree within a small additive constant of the optimum
+    in O(n log n). The result is an ordinary BST, so it can still be changed,
+    but inserts and deletes do not keep it optimal.
+    """
+    keys = sorted(frequencies)
+    weights = [frequencies[key] for key in keys]
+    if len(keys) <= exact_limit:
+        pick = _knuth_root(knuth_roots(weights))
+    else:
+        pick = _mehlhorn_root(weights)
+    
+    tree = BST()
+    stack = [(0, len(keys), None, False)] if keys else []
+    while stack:
+        low, high, parent, is_left = stack.pop()
+        r = pick(low, high)
+        node = BSTNode(keys[r])
+        node.parent = parent
+        if parent is None:
+            tree.root = node
+        elif is_left:
+            parent.left = node
+        else:
+            parent.right = node
+        if low < r:
+            stack.append((low, r, node, True))
+        if r + 1 < high:
+            stack.append((r + 1, high, node, False))
+    tree._shape_changed()
+    return tree
+
+def expected_cost(tree, frequencies):
+    """Mean number of nodes visited by a search, weighting each key by its frequency"""
+    total = sum(frequencies.values())
+    if not total:
+        return 0.0
+    visited = 0
+    level = [tree.root] if tree.root is not None else []
+    depth = 1
+    while level:
+        visited += depth * sum(frequencies.get(node.key, 0) for node in level)
+        level = [c for node in level for c in (node.left, node.right) if c is not None]
+        depth += 1
+    return visited / total
+
+def _search_cost(tree, key):
+    node = tree.root
+    visited = 0
+    while node is not None:
+        visited += 1
+        if key == node.key:
+            break
+        node = node.left if key < node.key else node.right
+    return visited
+
+def replay_cost(tree, accesses):
+    """Mean nodes visited per access when searching tree for accesses in order.
+    
+    Each search is also run for real, so self-adjusting trees are measured
+    in the state the earlier accesses left them in.
+    """
+    visited = 0
+    for key in accesses:
+        visited += _search_cost(tree, key)
+        tree.search(key)
+    return visited / len(accesses) if accesses else 0.0
+
+def zipf_workload(size, accesses, exponent=1.1, rng=None):
+    """size random keys and accesses lookups where the k-th most popular key has weight 1 / k**exponent"""
+    rng = rng or random.Random()
+    keys = rng.sample(range(1 << 40), size)
+    popular = keys[:]
+    rng.shuffle(popular)
+    weights = [1 / (rank + 1) ** exponent for rank in range(size)]
+    return keys, rng.choices(popular, weights, k=accesses)
+
+def compare(keys, accesses, frequencies=None, exact_limit=EXACT_LIMIT):
+    """Nodes visited per search and search time for the frequency-built tree against AVL, splay and plain BST.
+    
+    The dynamic trees are built by inserting keys in the given order.
+    """
+    frequencies = frequencies or workload_frequencies(accesses, keys)
+    start = time.perf_counter()
+    optimal = build_optimal(frequencies, exact_limit)
+    build_time = time.perf_counter() - start
+    trees = {"Optimal": optimal}
+    for cls in (AVLTree, SplayTree, BST):
+        tree = cls()
+        for key in keys:
+            tree.insert(key)
+        trees[cls.__name__] = tree
+    
+    results = {"keys": len(frequencies), "accesses": len(accesses),
+               "method": "knuth" if len(frequencies) <= exact_limit else "mehlhorn",
+               "build_s": build_time, "trees": {}}
+    for name, tree in trees.items():
+        result = {"height": tree.height()}
+        if name != "SplayTree":
+            result["expected_cost"] = expected_cost(tree, frequencies)
+        start = time.perf_counter()
+        for key in accesses:
+            tree.search(key)
+        result["search_ns"] = (time.perf_counter() - start) / len(accesses) * 1e9 if accesses else 0.0
+        results["trees"][name] = result
+    # Splay cost depends on the order of accesses, so it is replayed on a fresh tree
+    splay = SplayTree()
+    for key in keys:
+        splay.insert(key)
+    results["trees"]["SplayTree"]["expected_cost"] = replay_cost(splay, accesses)
+    return results
+
+def format_compare(results):
+    lines = [f"{results['accesses']} searches over {results['keys']} keys, "
+             f"{results['method']} build in {results['build_s']:.3f}s",
+             f"{'tree':<15}{'cost':>8}{'height':>8}{'ns/search':>11}"]
+    for name, r in results["trees"].items():
+        lines.append(f"{name:<15}{r['expected_cost']:>8.3f}{r['height']:>8}{r['search_ns']:>11.0f}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a static BST from access frequencies and compare search cost")
+    parser.add_argument("--keys", type=int, default=2000, help="number of keys for the Zipf workload")
+    parser.add_argument("--accesses", type=int, default=200000, help="number of searches for the Zipf workload")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--trace", help="take keys and searches from a recorded trace instead")
+    parser.add_argument("--exact-limit", type=int, default=EXACT_LIMIT,
+                        help="largest key count built with the exact O(n^2) method")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args()
+    
+    if args.trace:
+        frequencies = trace_frequencies(args.trace)
+        keys = list(frequencies)
+        random.Random(args.seed).shuffle(keys)
+        accesses = trace_searches(args.trace)
+    else:
+        keys, accesses = zipf_workload(args.keys, args.accesses, args.zipf, random.Random(args.seed))
+        frequencies = None
+    results = compare(keys, accesses, frequencies, args.exact_limit)
+    print(format_compare(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
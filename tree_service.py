@@ -0,0 +1,361 @@
+"""
+Asyncio tree service - shares named trees over a local socket with batched application
+
+Every frame is a little-endian uint32 body length followed by the body.
+
+Request body:  uint32 request id, uint8 op, uint8 name length, tree name (utf-8),
+               int64 key (insert/delete/search) or int64 low, int64 high (range)
+Response body: uint32 request id, uint8 status, then
+               uint8 result (insert/delete/search), or
+               uint32 count + count int64 keys (range), or
+               a utf-8 message when status is STATUS_ERROR
+"""
+import argparse
+import asyncio
+import multiprocessing
+import struct
+import time
+from tree_simulator import TREE_TYPES
+from tree_latency import LatencyHistogram, format_ns
+
+OP_INSERT = 1
+OP_DELETE = 2
+OP_SEARCH = 3
+OP_RANGE = 4
+OP_NAMES = {OP_INSERT: "insert", OP_DELETE: "delete", OP_SEARCH: "search", OP_RANGE: "range"}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+LENGTH = struct.Struct("<I")
+REQUEST_HEADER = struct.Struct("<IBB")
+RESPONSE_HEADER = struct.Struct("<IB")
+KEY = struct.Struct("<q")
+RANGE = struct.Struct("<qq")
+RESULT = struct.Struct("<B")
+COUNT = struct.Struct("<I")
+
+def encode_request(request_id, op, name, *args):
+    name = name.encode()
+    body = REQUEST_HEADER.pack(request_id, op, len(name)) + name
+    body += RANGE.pack(*args) if op == OP_RANGE else KEY.pack(*args)
+    return LENGTH.pack(len(body)) + body
+
+def decode_request(body):
+    request_id, op, name_len = REQUEST_HEADER.unpack_from(body)
+    offset = REQUEST_HEADER.size
+    name = body[offset:offset + name_len].decode()
+    offset += name_len
+    if op == OP_RANGE:
+        args = RANGE.unpack_from(body, offset)
+    elif op in OP_NAMES:
+        args = KEY.unpack_from(body, offset)
+    else:
+        raise ValueError(f"Unknown op code {op}")
+    return request_id, op, name, args
+
+def encode_response(request_id, op, result, error=None):
+    if error is not None:
+        body = RESPONSE_HEADER.pack(request_id, STATUS_ERROR) + error.encode()
+    elif op == OP_RANGE:
+        body = (RESPONSE_HEADER.pack(request_id, STATUS_OK) + COUNT.pack(len(result)) +
+                struct.pack(f"<{len(result)}q", *result))
+    else:
+        body = RESPONSE_HEADER.pack(request_id, STATUS_OK) + RESULT.pack(bool(result))
+    return LENGTH.pack(len(body)) + body
+
+def decode_response(body, op):
+    """Returns (request_id, result); raises RuntimeError for error responses"""
+    request_id, status = RESPONSE_HEADER.unpack_from(body)
+    payload = body[RESPONSE_HEADER.size:]
+    if status == STATUS_ERROR:
+        return request_id, RuntimeError(payload.decode())
+    if op == OP_RANGE:
+        count, = COUNT.unpack_from(payload)
+        return request_id, list(struct.unpack_from(f"<{count}q", payload, COUNT.size))
+    return request_id, bool(payload[0])
+
+async def read_frame(reader):
+    header = await reader.readexactly(LENGTH.size)
+    length, = LENGTH.unpack(header)
+    return await reader.readexactly(length)
+
+class TreeServer:
+    """Serves named Tree instances, applying queued requests in sorted batches.
+    
+    Requests from all connections go into one queue. The batcher takes
+    everything queued so far, splits it at range queries (which must see
+    every earlier write) and applies each segment sorted by key. The sort is
+    stable, so requests for the same key keep their arrival order and each
+    client's pipelined requests stay in order.
+    """
+    def __init__(self, trees, max_batch=4096):
+        self.trees = trees
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.applied = 0
+        self._batcher = None
+        self._server = None
+        self._clients = {}
+    
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        self._batcher = asyncio.create_task(self._run_batcher())
+        if path:
+            self._server = await asyncio.start_unix_server(self._handle_client, path)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server
+    
+    async def close(self):
+        self._server.close()
+        for writer in self._clients.values():
+            writer.close()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        await self._server.wait_closed()
+        self._batcher.cancel()
+    
+    async def _handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                body = await read_frame(reader)
+                try:
+                    request_id, op, name, args = decode_request(body)
+                except (ValueError, struct.error, UnicodeDecodeError) as e:
+                    request_id = LENGTH.unpack_from(body)[0] if len(body) >= LENGTH.size else 0
+                    writer.write(encode_response(request_id, 0, None, f"Bad request: {e}"))
+                    continue
+                future = loop.create_future()
+                future.add_done_callback(self._responder(writer, request_id, op))
+                self.queue.put_nowait((name, op, args, future))
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.pop(task, None)
+            writer.close()
+    
+    @staticmethod
+    def _responder(writer, request_id, op):
+        def respond(future):
+            if writer.is_closing():
+                return
+            error = future.exception()
+            if error is not None:
+                writer.write(encode_response(request_id, op, None, str(error)))
+            else:
+                writer.write(encode_response(request_id, op, future.result()))
+        return respond
+    
+    async def _run_batcher(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Let the other connections queue what they have before applying
+            await asyncio.sleep(0)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.apply_batch(batch)
+    
+    def apply_batch(self, batch):
+        self.batches += 1
+        self.applied += len(batch)
+        segment = []
+        for item in batch:
+            if item[1] == OP_RANGE:
+                self._apply_sorted(segment)
+                segment = []
+                self._apply(item)
+            else:
+                segment.append(item)
+        self._apply_sorted(segment)
+    
+    def _apply_sorted(self, segment):
+        segment.sort(key=lambda item: (item[0], item[2][0]))
+        for item in segment:
+            self._apply(item)
+    
+    def _apply(self, item):
+        name, op, args, future = item
+        if future.cancelled():
+            return
+        tree = self.trees.get(name)
+        try:
+            if tree is None:
+                raise ValueError(f"No tree named {name!r}")
+            if op == OP_INSERT:
+                tree.insert(args[0])
+                result = True
+            elif op == OP_DELETE:
+                result = tree.delete(args[0])
+            elif op == OP_SEARCH:
+                result = tree.search(args[0])
+            else:
+                result = tree.range(*args)
+        except Exception as e:
+            # Only this request fails; the batcher goes on with the rest
+            future.set_exception(e)
+            return
+        future.set_result(result)
+
+class TreeClient:
+    """Pipelining client: any number of requests may be in flight at once"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+        self._reader_task = asyncio.create_task(self._read_responses())
+    
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, path=None):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+    
+    async def close(self):
+        self.writer.close()
+        self._reader_task.cancel()
+    
+    async def _read_responses(self):
+        try:
+            while True:
+                body = await read_frame(self.reader)
+                request_id, = struct.unpack_from("<I", body)
+                future, op = self.pending.pop(request_id, (None, None))
+                if future is None or future.done():
+                    continue
+                _, result = decode_response(body, op)
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            for future, _ in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Connection lost: {e}"))
+            self.pending.clear()
+    
+    def request(self, op, name, *args):
+        """Send a request without waiting; returns a future for its result"""
+        request_id = self.next_id
+        self.next_id = (self.next_id + 1) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = (future, op)
+        self.writer.write(encode_request(request_id, op, name, *args))
+        return future
+    
+    async def insert(self, name, key):
+        return await self.request(OP_INSERT, name, key)
+    
+    async def delete(self, name, key):
+        return await self.request(OP_DELETE, name, key)
+    
+    async def search(self, name, key):
+        return await self.request(OP_SEARCH, name, key)
+    
+    async def range(self, name, low, high):
+        return await self.request(OP_RANGE, name, low, high)
+
+def parse_tree_specs(specs):
+    """["main=AVLTree", "RBTree"] -> {"main": AVLTree(), "RBTree": RBTree()}"""
+    trees = {}
+    for spec in specs:
+        name, _, tree_type = spec.partition("=")
+        tree_type = tree_type or name
+        if tree_type not in TREE_TYPES:
+            raise ValueError(f"Unknown tree type {tree_type!r}")
+        trees[name] = TREE_TYPES[tree_type]()
+    return trees
+
+async def serve(trees, host, port, path):
+    server = TreeServer(trees)
+    await server.start(host, port, path)
+    print(f"Serving {', '.join(trees)} on {path or f'{host}:{port}'}", flush=True)
+    await asyncio.Event().wait()
+
+def _serve_process(specs, host, port, path, ready):
+    async def run():
+        server = TreeServer(parse_tree_specs(specs))
+        await server.start(host, port, path)
+        ready.set()
+        await asyncio.Event().wait()
+    asyncio.run(run())
+
+async def _load_client(host, port, path, name, keys, depth, histogram):
+    """Issue insert, search and delete for each key with up to depth requests in flight"""
+    client = await TreeClient.connect(host, port, path)
+    clock = time.perf_counter_ns
+    window = asyncio.Semaphore(depth)
+    
+    async def one(op, key):
+        async with window:
+            start = clock()
+            await client.request(op, name, key)
+            histogram.record(clock() - start)
+    
+    for op in (OP_INSERT, OP_SEARCH, OP_DELETE):
+        await asyncio.gather(*(one(op, key) for key in keys))
+    await client.close()
+
+async def run_load(host, port, path, name, concurrency, requests, depth, seed):
+    keys = list(range(seed, seed + requests))
+    histogram = LatencyHistogram()
+    shares = [keys[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_load_client(host, port, path, name, share, depth, histogram)
+                           for share in shares))
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "requests": 3 * requests,
+            "ops_per_s": 3 * requests / elapsed, "latency": histogram.summary()}
+
+def benchmark(tree_type, host, port, path, requests, levels, depth):
+    """Start a server process and measure throughput/latency at each concurrency level"""
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=_serve_process,
+                                     args=([f"bench={tree_type}"], host, port, path, ready), daemon=True)
+    server.start()
+    try:
+        if not ready.wait(10):
+            raise RuntimeError("Tree server did not start")
+        results = []
+        for i, concurrency in enumerate(levels):
+            results.append(asyncio.run(run_load(host, port, path, "bench", concurrency,
+                                                requests, depth, i * requests)))
+        return results
+    finally:
+        server.terminate()
+        server.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Share trees over a local socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = commands.add_parser("serve", help="run the tree server")
+    serve_cmd.add_argument("trees", nargs="+", metavar="NAME=TYPE",
+                           help=f"trees to serve; TYPE is one of {', '.join(TREE_TYPES)}")
+    bench_cmd = commands.add_parser("bench", help="load-test a fresh server at increasing concurrency")
+    bench_cmd.add_argument("--tree", choices=list(TREE_TYPES), default="AVLTree")
+    bench_cmd.add_argument("--requests", type=int, default=5000, help="keys per level (3 requests each)")
+    bench_cmd.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    bench_cmd.add_argument("--depth", type=int, default=1, help="pipelined requests per client")
+    args = parser.parse_args()
+    
+    if args.command == "serve":
+        asyncio.run(serve(parse_tree_specs(args.trees), args.host, args.port, args.unix))
+        return
+    print(f"{'clients':>8}{'ops/s':>12}{'p50':>11}{'p99':>11}{'p99.9':>11}{'max':>11}")
+    for r in benchmark(args.tree, args.host, args.port, args.unix, args.requests, args.levels, args.depth):
+        s = r["latency"]
+        print(f"{r['concurrency']:>8}{r['ops_per_s']:>12,.0f}{format_ns(s['p50_ns']):>11}"
+              f"{format_ns(s['p99_ns']):>11}{format_ns(s['p99.9_ns']):>11}{format_ns(s['max_ns']):>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Key-range sharded tree for concurrent multi-threaded access
+"""
+import argparse
+import bisect
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from tree_simulator import TREE_TYPES
+
+class RWLock:
+    """Readers-writer lock; waiting writers block new readers so they cannot starve"""
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+    
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+    
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+    
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+    
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+    
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+    
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class _Layout:
+    """One generation of shard boundaries, trees and locks"""
+    def __init__(self, boundaries, trees):
+        self.boundaries = boundaries
+        self.trees = trees
+        self.locks = [RWLock() for _ in trees]
+        # Readers share a shard lock, so the operation counts have their own
+        self.operations = [0] * len(trees)
+        self.count_locks = [threading.Lock() for _ in trees]
+
+def _balanced_order(keys):
+    """Sorted keys reordered midpoint-first so plain BST shards come out balanced"""
+    ranges = deque([(0, len(keys))])
+    while ranges:
+        low, high = ranges.popleft()
+        if low < high:
+            mid = (low + high) // 2
+            yield keys[mid]
+            ranges.append((low, mid))
+            ranges.append((mid + 1, high))
+
+class ShardedTree:
+    """Partitions the key space over independent trees, each behind its own lock.
+    
+    Shard i holds the keys k with boundaries[i - 1] <= k < boundaries[i].
+    Operations look up the current layout without locking, lock their shard
+    and retry if a rebalance replaced the layout in the meantime.
+    """
+    def __init__(self, tree_type="AVLTree", shards=4, low=0, high=1 << 32, sample_size=4096):
+        self.tree_class = TREE_TYPES[tree_type] if isinstance(tree_type, str) else tree_type
+        step = (high - low) / shards
+        boundaries = [low + round(step * i) for i in range(1, shards)]
+        self._layout = _Layout(boundaries, [self.tree_class() for _ in range(shards)])
+        self._rebalance_lock = threading.Lock()
+        self.recent_keys = deque(maxlen=sample_size)
+        self._recent_lock = threading.Lock()  # appends race with the copy taken by rebalance
+    
+    @property
+    def shards(self):
+        return len(self._layout.trees)
+    
+    @property
+    def boundaries(self):
+        return list(self._layout.boundaries)
+    
+    @property
+    def operations(self):
+        """Operations per shard since the last rebalance"""
+        return list(self._layout.operations)
+    
+    def _shard_for(self, key):
+        return bisect.bisect_right(self._layout.boundaries, key)
+    
+    def _locked(self, key, write):
+        """Run under the lock of the shard that owns key; returns (layout, index)"""
+        while True:
+            layout = self._layout
+            i = bisect.bisect_right(layout.boundaries, key)
+            lock = layout.locks[i]
+            (lock.acquire_write if write else lock.acquire_read)()
+            if self._layout is layout:
+                return layout, i
+            (lock.release_write if write else lock.release_read)()
+    
+    def _run(self, key, write, op):
+        layout, i = self._locked(key, write)
+        try:
+            with layout.count_locks[i]:
+                layout.operations[i] += 1
+            with self._recent_lock:
+                self.recent_keys.append(key)
+            return op(layout.trees[i])
+        finally:
+            (layout.locks[i].release_write if write else layout.locks[i].release_read)()
+    
+    def insert(self, key):
+        return self._run(key, True, lambda tree: tree.insert(key))
+    
+    def delete(self, key):
+        return self._run(key, True, lambda tree: tree.delete(key))
+    
+    def search(self, key):
+        return self._run(key, self.tree_class.search_mutates, lambda tree: tree.search(key))
+    
+    def irange(self, low=None, high=None):
+        """Iterate over keys in order across shards, one shard snapshot at a time.
+        
+        Duplicates are yielded as often as they are stored. A rebalance during
+        iteration makes it resume from the last key yielded, skipping the
+        copies of that key it already yielded; keys changed by other threads
+        in the meantime may or may not be seen.
+        """
+        last = None
+        copies = 0  # times last has been yielded
+        while True:
+            layout = self._layout
+            first = low if last is None else last
+            start = 0 if first is None else bisect.bisect_right(layout.boundaries, first)
+            for i in range(start, len(layout.trees)):
+                if high is not None and i > 0 and layout.boundaries[i - 1] > high:
+                    return
+                lock = layout.locks[i]
+                lock.acquire_read()
+                try:
+                    if self._layout is not layout:
+                        break
+                    chunk = layout.trees[i].range(first, high)
+                finally:
+                    lock.release_read()
+                # Only a resumed listing gets keys equal to last again; skip the copies already yielded
+                resumed, skip = last, copies
+                for key in chunk:
+                    if skip and key == resumed:
+                        skip -= 1
+                        continue
+                    if key == last:
+                        copies += 1
+                    else:
+                        last, copies = key, 1
+                    yield key
+            else:
+                return
+    
+    def keys(self):
+        return self.irange()
+    
+    def range(self, low, high):
+        return list(self.irange(low, high))
+    
+    def shard_sizes(self):
+        sizes = []
+        layout = self._layout
+        for tree, lock in zip(layout.trees, layout.locks):
+            with lock.read():
+                sizes.append(sum(tree.depth_histogram()))
+        return sizes
+    
+    def is_skewed(self, factor=2.0):
+        """True when the busiest shard saw factor times the mean number of operations"""
+        operations = self.operations
+        total = sum(operations)
+        return total > 0 and max(operations) > factor * total / len(operations)
+    
+    def rebalance(self, factor=2.0, force=False):
+        """Move shard boundaries to quantiles of the recently used keys.
+        
+        Does nothing unless the operation counts are skewed (or force is set).
+        All shards are locked for writing while their keys are redistributed.
+        """
+        with self._rebalance_lock:
+            if not force and not self.is_skewed(factor):
+                return False
+            with self._recent_lock:
+                sample = list(self.recent_keys)
+            sample.sort()
+            shards = self.shards
+            if len(sample) < shards:
+                return False
+            boundaries = [sample[len(sample) * i // shards] for i in range(1, shards)]
+            old = self._layout
+            for lock in old.locks:
+                lock.acquire_write()
+            try:
+                keys = [key for tree in old.trees for key in tree.keys()]
+                trees = [self.tree_class() for _ in range(shards)]
+                cuts = [0] + [bisect.bisect_left(keys, b) for b in boundaries] + [len(keys)]
+                for tree, a, b in zip(trees, cuts, cuts[1:]):
+                    for key in _balanced_order(keys[a:b]):
+                        tree.insert(key)
+                self._layout = _Layout(boundaries, trees)
+            finally:
+                for lock in old.locks:
+                    lock.release_write()
+            return True
+
+def _worker(tree, keys, ops, barrier, counts, index):
+    rng = random.Random(index)
+    choice = rng.random
+    barrier.wait()
+    done = 0
+    for key in keys:
+        r = choice()
+        if r < ops[0]:
+            tree.search(key)
+        elif r < ops[0] + ops[1]:
+            tree.insert(key)
+        else:
+            tree.delete(key)
+        done += 1
+    counts[index] = done
+
+def thread_scaling(tree_type="AVLTree", shards=8, threads=(1, 2, 4, 8), operations=200000,
+                   key_space=1000000, mix=(0.8, 0.1), skew=0.0, seed=0):
+    """Throughput of a mixed workload (searches, inserts, rest deletes) per thread count.
+    
+    With skew > 0 that fraction of keys lands in the lowest 1% of the key
+    space; the shard boundaries are rebalanced after the preload.
+    """
+    rng = random.Random(seed)
+    hot = key_space // 100
+    
+    def draw():
+        return rng.randrange(hot) if rng.random() < skew else rng.randrange(key_space)
+    
+    results = []
+    for count in threads:
+        tree = ShardedTree(tree_type, shards, 0, key_space)
+        preload = [draw() for _ in range(operations // 2)]
+        for key in preload:
+            tree.insert(key)
+        rebalanced = tree.rebalance()
+        per_thread = operations // count
+        work = [[draw() for _ in range(per_thread)] for _ in range(count)]
+        barrier = threading.Barrier(count + 1)
+        counts = [0] * count
+        workers = [threading.Thread(target=_worker, args=(tree, work[i], mix, barrier, counts, i))
+                   for i in range(count)]
+        for w in workers:
+            w.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        results.append({"threads": count, "ops_per_s": sum(counts) / elapsed, "rebalanced": rebalanced})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Thread-scaling benchmark for ShardedTree")
+    parser.add_argument("--tree", choices=list(TREE_TYPES), default="AVLTree")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--operations", type=int, default=200000)
+    parser.add_argument("--skew", type=float, default=0.0, help="fraction of keys drawn from the hottest 1%%")
+    args = parser.parse_args()
+    
+    print(f"{'shards':>7}{'threads':>9}{'ops/s':>12}")
+    for shards in args.shards:
+        for r in thread_scaling(args.tree, shards, args.threads, args.operations, skew=args.skew):
+            print(f"{shards:>7}{r['threads']:>9}{r['ops_per_s']:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
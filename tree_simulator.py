@@ -1,8 +1,12 @@
 """
-Tree Simulator - BST, Red-Black, AVL, Splay, and 2-3 Trees
+Tree Simulator - BST, Red-Black, AVL, Splay, 2-3 Trees, Treaps, Scapegoat Trees, WAVL Trees
+and Skip Lists
 """
+import bisect
+import math
 import time
 import random
+from collections import Counter
 from abc import ABC, abstractmethod
 from typing import List, Tuple, Optional
 import tkinter as tk
@@ -10,6 +14,8 @@ from tkinter import ttk, messagebox, simpledialog
 
 # Base Node Classes
 class BSTNode:
+    value = None  # set per node only when the tree is used as a map, see Tree.set_value
+    
     def __init__(self, key):
         self.key = key
         self.left = None
@@ -29,7 +35,26 @@ class AVLNode(BSTNode):
 class SplayNode(BSTNode):
     pass
 
+class TreapNode(BSTNode):
+    def __init__(self, key):
+        super().__init__(key)
+        self.priority = random.random()
+
+class WAVLNode(BSTNode):
+    def __init__(self, key):
+        super().__init__(key)
+        self.rank = 0  # Leaves have rank 0, missing children rank -1
+
+class SkipNode:
+    value = None  # set per node only when the list is used as a map, see Tree.set_value
+    
+    def __init__(self, key, level):
+        self.key = key
+        self.forward = [None] * level
+
 class Node23:
+    values = None  # list parallel to keys once the tree is used as a map, see Tree23.set_value
+    
     def __init__(self):
         self.keys = []
         self.children = []
@@ -40,9 +65,48 @@ class Node23:
 
 # Base Tree Class
 class Tree(ABC):
+    search_mutates = False  # True when search restructures the tree
+    unique_keys = False  # True when inserting a key that is already stored does nothing
+    hooked_operations = ("insert", "delete", "search", "finger_insert")
+    hook_aliases = {"finger_insert": "insert"}  # hooks see these under the operation they perform
+    
     def __init__(self):
         self.root = None
         self.operations_log = []
+        self._depths = []  # keys per depth, None when it must be rescanned
+        self._imbalance = 0  # None when it must be rescanned
+        self._hooks = []
+        self._tombstones = None  # Counter of lazily deleted keys, None when deletes are eager
+        self._buffer = None  # key -> [pending count change, stored count or None], None when writes are direct
+        self._finger = None  # last finger_insert position, None after changes that may move it
+        self._finger_low = self._finger_high = None  # keys in the finger's subtree lie in [low, high)
+    
+    # Operation hooks (latency and trace recorders)
+    def add_hook(self, hook, inner=False):
+        """Wrap insert/delete/search on this instance.
+        
+        hook(op, method) returns the callable to use instead of method. Hooks
+        added later wrap earlier ones unless inner is set.
+        """
+        if inner:
+            self._hooks.insert(0, hook)
+        else:
+            self._hooks.append(hook)
+        self._apply_hooks()
+    
+    def remove_hook(self, hook):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+            self._apply_hooks()
+    
+    def _apply_hooks(self):
+        for op in self.hooked_operations:
+            self.__dict__.pop(op, None)
+            if self._hooks:
+                method = getattr(self, op)
+                for hook in self._hooks:
+                    method = hook(self.hook_aliases.get(op, op), method)
+                setattr(self, op, method)
     
     @abstractmethod
     def insert(self, key):
@@ -52,10 +116,575 @@ class Tree(ABC):
     def delete(self, key):
         pass
     
+    @abstractmethod
+    def search(self, key):
+        pass
+    
     @abstractmethod
     def to_string(self):
         pass
     
+    # Finger insertion
+    def finger_insert(self, key):
+        """Insert key starting from where the previous finger_insert left off.
+        
+        Trees without a finger path insert from the root as usual.
+        """
+        return type(self).insert(self, key)
+    
+    def insert_many(self, keys, min_run=4):
+        """Insert keys in order, switching to finger_insert inside sorted runs.
+        
+        A key continues a run when it moves in the same direction (up or down)
+        as the previous min_run - 1 steps; the first key that breaks a run goes
+        in from the root again.
+        """
+        insert, finger_insert = self.insert, self.finger_insert
+        previous = None
+        direction = run = 0
+        for key in keys:
+            if previous is not None:
+                step = (key > previous) - (key < previous)
+                run = run + 1 if step and step == direction else 1
+                direction = step
+            (finger_insert if run >= min_run else insert)(key)
+            previous = key
+    
+    def _finger_start(self, key):
+        """(node, low, high) to start a binary descent for key from.
+        
+        The finger is used directly when key falls inside its bounds. Otherwise
+        the walk climbs parent links to the lowest ancestor on the far side of
+        key, whose subtree must hold key's position. The bounds returned can be
+        narrower than the real ones, which only costs an earlier climb later.
+        """
+        node = self._finger
+        if node is None:
+            return self.root, None, None
+        low, high = self._finger_low, self._finger_high
+        if (low is None or low <= key) and (high is None or key < high):
+            return node, low, high
+        if key >= node.key:
+            while node.parent is not None and (node is node.parent.right or node.parent.key <= key):
+                node = node.parent
+            if node.parent is None:
+                return node, None, None
+            return node, low, node.parent.key
+        while node.parent is not None and (node is node.parent.left or node.parent.key > key):
+            node = node.parent
+        if node.parent is None:
+            return node, None, None
+        return node, node.parent.key, high
+    
+    def _attach(self, new_node, start, low=None, high=None):
+        """Hang new_node below start where a plain descent puts it and make it the finger.
+        
+        Returns its depth below start. Equal keys go right, as in every binary tree here.
+        """
+        key = new_node.key
+        depth = 0
+        if start is None:
+            self.root = new_node
+        else:
+            node = start
+            depth = 1
+            while True:
+                if key < node.key:
+                    high = node.key
+                    if node.left is None:
+                        node.left = new_node
+                        break
+                    node = node.left
+                else:
+                    low = node.key
+                    if node.right is None:
+                        node.right = new_node
+                        break
+                    node = node.right
+                depth += 1
+            new_node.parent = node
+        self._finger, self._finger_low, self._finger_high = new_node, low, high
+        return depth
+    
+    # Shape statistics
+    # The depth histogram is updated in place by inserts and leaf deletes that do
+    # not rotate (binary trees) and by every insert and delete of a 2-3 tree. Other
+    # changes, such as rotations, rebuilds and every splay, mark it stale and the
+    # next query rescans the tree in O(n).
+    def _shape_changed(self):
+        """Drop cached statistics after a mutation that moved existing nodes"""
+        self._depths = None
+        self._imbalance = None
+    
+    def _record_depth(self, depth, delta):
+        """Keep the depth histogram current for a key added or removed at depth"""
+        self._imbalance = None
+        if self._depths is None:
+            return
+        if depth == len(self._depths):
+            self._depths.append(0)
+        self._depths[depth] += delta
+        while self._depths and self._depths[-1] == 0:
+            self._depths.pop()
+    
+    
+    @staticmethod
+    def _children(node):
+        if hasattr(node, 'children'):
+            return [c for c in node.children if c is not None]
+        return [c for c in (node.left, node.right) if c is not None]
+    
+    def depth_histogram(self):
+        """Number of keys at each depth (root is depth 0)"""
+        if self._depths is None:
+            depths = []
+            level = [self.root] if self.root is not None else []
+            while level:
+                depths.append(sum(len(n.keys) if hasattr(n, 'keys') else 1 for n in level))
+                level = [c for n in level for c in self._children(n)]
+            self._depths = depths
+        return list(self._depths)
+    
+    def height(self):
+        """Number of levels in the tree (0 when empty)"""
+        if self._depths is None:
+            self.depth_histogram()
+        return len(self._depths)
+    
+    def internal_path_length(self):
+        """Sum of the depths of all keys"""
+        return sum(d * c for d, c in enumerate(self.depth_histogram()))
+    
+    def average_depth(self):
+        """Mean depth of a key, i.e. expected comparisons - 1 for a uniform search"""
+        depths = self.depth_histogram()
+        count = sum(depths)
+        return self.internal_path_length() / count if count else 0.0
+    
+    def max_imbalance(self):
+        """Largest height difference between sibling subtrees.
+        
+        Binary trees do not all store subtree heights, so this is rescanned
+        in O(n) after any change; 2-3 trees are always 0.
+        """
+        if self._imbalance is None:
+            self._imbalance = self._scan_imbalance()
+        return self._imbalance
+    
+    def _scan_imbalance(self):
+        heights = {}
+        worst = 0
+        stack = [(self.root, False)] if self.root is not None else []
+        while stack:
+            node, expanded = stack.pop()
+            children = self._children(node)
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((c, False) for c in children)
+                continue
+            slots = node.children if hasattr(node, 'children') else [node.left, node.right]
+            if not hasattr(node, 'children') or slots:
+                child_heights = [heights.pop(id(c)) if c is not None else 0 for c in slots]
+                worst = max(worst, max(child_heights) - min(child_heights))
+                heights[id(node)] = 1 + max(child_heights)
+            else:
+                heights[id(node)] = 1
+        return worst
+    
+    # Lazy deletion
+    def enable_lazy_delete(self, max_fraction=0.25):
+        """Make delete mark keys as tombstones instead of restructuring the tree.
+        
+        Searches and iterators skip tombstones, and inserting a tombstoned key
+        revives it. Once more than max_fraction of the stored keys are
+        tombstones the tree is rebuilt from the live keys in linear time.
+        find_* and to_string still show the stored tree.
+        """
+        if self._buffer is not None:
+            raise RuntimeError("Lazy deletion cannot be combined with the write buffer")
+        self.lazy_fraction = max_fraction
+        if self._tombstones is None:
+            self._tombstones = Counter()
+            self._dead = 0
+            self._stored = sum(self.depth_histogram())
+            self.add_hook(self._lazy_hook, inner=True)
+    
+    def disable_lazy_delete(self):
+        if self._tombstones is not None:
+            self.compact()
+            self.remove_hook(self._lazy_hook)
+            self._tombstones = None
+    
+    def compact(self):
+        """Rebuild the tree without its tombstones"""
+        if self._tombstones:
+            live = list(self.keys())
+            self._load_sorted(live)
+            self._tombstones.clear()
+            self._dead = 0
+            self._stored = len(live)
+    
+    def _contains(self, key):
+        """Membership test that bypasses the hooks and never restructures"""
+        if self.search_mutates:
+            return next(self._irange(key, key), None) is not None
+        return type(self).search(self, key)
+    
+    def _lazy_hook(self, op, method):
+        tombstones = self._tombstones
+        if op == "insert":
+            def insert(key):
+                dead = tombstones[key]
+                if dead:
+                    if dead == 1:
+                        del tombstones[key]
+                    else:
+                        tombstones[key] = dead - 1
+                    self._dead -= 1
+                    return None
+                # Trees with unique keys ignore a key that is already stored
+                if not (self.unique_keys and self._contains(key)):
+                    self._stored += 1
+                return method(key)
+            return insert
+        if op == "delete":
+            def delete(key):
+                dead = tombstones[key]
+                if dead:
+                    if len(list(self._irange(key, key))) <= dead:
+                        return False
+                elif not self._contains(key):
+                    return False
+                tombstones[key] = dead + 1
+                self._dead += 1
+                if self._dead > self.lazy_fraction * self._stored:
+                    self.compact()
+                return True
+            return delete
+        def search(key):
+            dead = tombstones[key]
+            if not dead:
+                return method(key)
+            return len(list(self._irange(key, key))) > dead
+        return search
+    
+    # Write buffering
+    def enable_write_buffer(self, capacity=4096, merge_fraction=1.0):
+        """Collect inserts and deletes in a buffer and apply them to the tree in sorted batches.
+        
+        search and delete answer from the buffer and the tree together, and
+        irange/keys flush first. The buffer is flushed once it holds capacity
+        keys. A batch is applied with finger inserts in key order, or by
+        merging it with the stored keys and rebuilding in linear time when it
+        is at least merge_fraction of the tree. find_* and to_string show the
+        stored tree, so call flush() before using them.
+        """
+        if self._tombstones is not None:
+            raise RuntimeError("The write buffer cannot be combined with lazy deletion")
+        self.buffer_capacity = capacity
+        self.merge_fraction = merge_fraction
+        if self._buffer is None:
+            self._buffer = {}
+            self._buffered_size = sum(self.depth_histogram())  # estimate, only used to pick the merge path
+            self.add_hook(self._buffer_hook, inner=True)
+    
+    def disable_write_buffer(self):
+        if self._buffer is not None:
+            self.flush()
+            self.remove_hook(self._buffer_hook)
+            self._buffer = None
+    
+    def flush(self):
+        """Apply the buffered inserts and deletes to the tree in key order"""
+        pending = self._buffer
+        if not pending:
+            return
+        inserts, deletes = [], []
+        for key in sorted(pending):
+            change, stored = pending[key]
+            if self.unique_keys:
+                # change is the final state: 1 present, -1 absent
+                (inserts if change > 0 else deletes).append(key)
+            elif change > 0:
+                inserts.extend([key] * change)
+            elif change < 0:
+                deletes.extend([key] * -change)
+        pending.clear()
+        self._buffered_size += len(inserts) - len(deletes)
+        if len(inserts) + len(deletes) >= self.merge_fraction * self._buffered_size:
+            self._merge_sorted(inserts, deletes)
+            return
+        delete, finger_insert = type(self).delete, type(self).finger_insert
+        for key in deletes:
+            delete(self, key)
+        for key in inserts:
+            finger_insert(self, key)
+    
+    def _merge_sorted(self, inserts, deletes):
+        """Rebuild from the stored keys merged with sorted inserts and without sorted deletes"""
+        merged = []
+        stored = self._irange(None, None)
+        doomed = Counter(deletes)
+        i = 0
+        for key in stored:
+            while i < len(inserts) and inserts[i] <= key:
+                if not (self.unique_keys and inserts[i] == key):
+                    merged.append(inserts[i])
+                i += 1
+            if doomed[key]:
+                doomed[key] -= 1
+            else:
+                merged.append(key)
+        merged.extend(inserts[i:])
+        self._load_sorted(merged)
+        self._buffered_size = len(merged)
+    
+    def _stored_count(self, key):
+        """How often key is stored in the tree itself, bypassing the hooks"""
+        if self.unique_keys:
+            return int(self._contains(key))
+        return sum(1 for _ in self._irange(key, key))
+    
+    def _buffer_hook(self, op, method):
+        pending = self._buffer
+        unique = self.unique_keys
+        
+        def entry(key):
+            if key not in pending:
+                pending[key] = [0, None]
+            return pending[key]
+        
+        def current(record, key):
+            change, stored = record
+            if unique:
+                return change > 0 if change else self._stored_count(key) > 0
+            if stored is None:
+                if change > 0:
+                    return change
+                record[1] = stored = self._stored_count(key)
+            return stored + change
+        
+        def full():
+            if len(pending) >= self.buffer_capacity:
+                self.flush()
+        
+        if op == "insert":
+            def insert(key):
+                record = pending.get(key)
+                if record is None:
+                    pending[key] = [1, None]
+                    if len(pending) >= self.buffer_capacity:
+                        self.flush()
+                elif unique:
+                    record[0] = 1
+                else:
+                    record[0] += 1
+                return None
+            return insert
+        if op == "delete":
+            def delete(key):
+                record = entry(key)
+                if not current(record, key):
+                    if record == [0, None] or not unique and record[0] == 0:
+                        del pending[key]
+                    return False
+                if unique:
+                    record[0] = -1
+                else:
+                    record[0] -= 1
+                full()
+                return True
+            return delete
+        def search(key):
+            record = pending.get(key)
+            if record is None:
+                return method(key)
+            return bool(current(record, key))
+        return search
+    
+    # Bulk loading
+    @classmethod
+    def build_from_sorted(cls, keys):
+        """New tree holding the sorted keys, built in linear time"""
+        tree = cls()
+        tree._load_sorted(list(keys))
+        return tree
+    
+    def _load_sorted(self, keys, values=None):
+        """Replace the contents with a perfectly balanced tree of the sorted keys, and their values if given"""
+        nodes = [self.node_class(key) for key in keys]
+        if values is not None:
+            for node, value in zip(nodes, values):
+                node.value = value
+        self.root = self._link_balanced(nodes, 0, len(nodes), None)
+        self._finger = None
+        self._shape_changed()
+    
+    def _link_balanced(self, nodes, low, high, parent):
+        """Link nodes[low:high], in key order, into a balanced subtree under parent"""
+        if low >= high:
+            return None
+        mid = (low + high) // 2
+        node = nodes[mid]
+        node.parent = parent
+        node.left = self._link_balanced(nodes, low, mid, node)
+        node.right = self._link_balanced(nodes, mid + 1, high, node)
+        return node
+    
+    def _level_order(self):
+        """Binary tree nodes in breadth-first order"""
+        nodes = [self.root] if self.root is not None else []
+        for node in nodes:
+            if node.left is not None:
+                nodes.append(node.left)
+            if node.right is not None:
+                nodes.append(node.right)
+        return nodes
+    
+    def record_trace(self, path):
+        """Start writing this tree's operations to a binary trace, see tree_trace.TraceRecorder.
+        
+        Close the returned recorder to flush the remaining records.
+        """
+        from tree_trace import TraceRecorder
+        return TraceRecorder(path).attach_to(self)
+    
+    def to_arrays(self):
+        """Columnar NumPy export of the tree, see tree_arrays.tree_to_arrays"""
+        from tree_arrays import tree_to_arrays
+        return tree_to_arrays(self)
+    
+    def freeze(self, layout="eytzinger"):
+        """Immutable array-backed snapshot for read-only phases, see tree_snapshot.FrozenTree"""
+        from tree_snapshot import FrozenTree
+        return FrozenTree(self.keys(), layout)
+    
+    def keys(self):
+        """Iterate over all keys in sorted order"""
+        return self.irange()
+    
+    def range(self, low, high):
+        """Sorted list of the keys k with low <= k <= high"""
+        return list(self.irange(low, high))
+    
+    def irange(self, low=None, high=None):
+        """Iterate in sorted order over the keys between low and high (inclusive).
+        
+        Subtrees that lie entirely below low are skipped and the walk stops at
+        the first key above high; None leaves that side open.
+        """
+        if self._buffer:
+            self.flush()
+        keys = self._irange(low, high)
+        if self._tombstones:
+            return self._skip_tombstones(keys)
+        return keys
+    
+    def _skip_tombstones(self, keys):
+        # Only the keys the walk reaches are looked up, so a short range stays O(log n)
+        tombstones = self._tombstones
+        skipped = {}
+        for key in keys:
+            done = skipped.get(key, 0)
+            if done < tombstones[key]:
+                skipped[key] = done + 1
+            else:
+                yield key
+    
+    def _irange(self, low, high, values=False):
+        """Keys between low and high in order, or (key, value) pairs when values is set"""
+        node = self.root
+        if node is None:
+            return
+        if hasattr(node, 'children'):
+            # 2-3 tree: (node, i) frames yield keys[i - 1] and then walk child i
+            stack = [(node, 0)]
+            while stack:
+                node, i = stack.pop()
+                children = [c for c in node.children if c is not None]
+                if i > 0 or not children:
+                    for j in range(max(i - 1, 0), i if children else len(node.keys)):
+                        key = node.keys[j]
+                        if high is not None and key > high:
+                            return
+                        if low is None or key >= low:
+                            if values:
+                                yield key, node.values[j] if node.values is not None else None
+                            else:
+                                yield key
+                if i < len(children):
+                    if i < len(node.keys):
+                        stack.append((node, i + 1))
+                    if low is None or i == len(node.keys) or node.keys[i] >= low:
+                        stack.append((children[i], 0))
+            return
+        stack = []
+        while stack or node is not None:
+            while node is not None:
+                if low is not None and node.key < low:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if high is not None and node.key > high:
+                return
+            yield (node.key, node.value) if values else node.key
+            node = node.right
+    
+    # Values stored with keys
+    def get_value(self, key, default=None):
+        """Value stored with key, or default when key is not in the tree"""
+        node = self._find_node(key)
+        return default if node is None else node.value
+    
+    def set_value(self, key, value):
+        """Store value with key, inserting key if it is missing; True when it was inserted.
+        
+        Values live on the nodes and move with their keys. The write buffer
+        and lazy deletion only track keys, so they cannot be combined with values.
+        """
+        self._check_values()
+        node = self._find_node(key)
+        if node is None:
+            node = self._insert_node(key)
+            node.value = value
+            return True
+        node.value = value
+        return False
+    
+    def pop_value(self, key, default=None):
+        """Delete key and return its value, or default when key is not in the tree"""
+        node = self._find_node(key)
+        if node is None:
+            return default
+        value = node.value
+        type(self).delete(self, key)
+        return value
+    
+    def items(self, low=None, high=None):
+        """Iterate in sorted order over the (key, value) pairs with low <= key <= high"""
+        self._check_values()
+        return self._irange(low, high, values=True)
+    
+    def _check_values(self):
+        if self._buffer is not None or self._tombstones is not None:
+            raise RuntimeError("Values are not kept by the write buffer or lazy deletion")
+    
+    def _find_node(self, key):
+        """Binary tree node holding key, or None"""
+        node = self.root
+        while node is not None and node.key != key:
+            node = node.left if key < node.key else node.right
+        return node
+    
+    def _insert_node(self, key):
+        """Insert key and return the node that holds it"""
+        type(self).insert(self, key)
+        return self._find_node(key)
+    
     def find_leaf_nodes(self):
         """Find all leaf nodes"""
         leaves = []
@@ -146,50 +775,188 @@ class Tree(ABC):
 
 # Binary Search Tree
 class BST(Tree):
+    node_class = BSTNode
+    height_factor = None  # rebuild once a leaf is deeper than this times log2(n), None when never
+    
     def insert(self, key):
-        if self.root is None:
-            self.root = BSTNode(key)
-        else:
-            self._insert_recursive(self.root, key)
+        self._insert_node(key)
     
-    def _insert_recursive(self, node, key):
-        if key < node.key:
-            if node.left is None:
-                node.left = BSTNode(key)
-                node.left.parent = node
+    def _insert_node(self, key):
+        node, _ = self._insert_leaf(key)
+        self._balance_inserted(node)
+        return node
+    
+    def finger_insert(self, key):
+        node, _ = self._insert_leaf(key, finger=True)
+        self._balance_inserted(node)
+    
+    def _balance_inserted(self, node):
+        """Restore the balance invariant after node was added as a leaf"""
+        if self.height_factor is None:
+            return
+        self.size += 1
+        self.max_size = max(self.max_size, self.size)
+        depth = self._depth(node)
+        if depth <= self.height_factor * math.log2(self.size):
+            return
+        # Too deep: rebuild the lowest ancestor whose subtree breaks the bound on its own
+        size = 1
+        below = 0
+        while node.parent is not None:
+            parent = node.parent
+            sibling = parent.right if node is parent.left else parent.left
+            size += 1 + self._subtree_size(sibling)
+            below += 1
+            if below > self.height_factor * math.log2(size):
+                self._dsw_rebuild(parent)
+                return
+            node = parent
+    
+    # Height-bounded rebuilding
+    def enable_rebalancing(self, factor=2.0):
+        """Keep the height within factor * log2(n) by rebuilding subtrees that grow too deep.
+        
+        An insert that lands deeper than the bound rebuilds the lowest ancestor
+        whose own subtree is too deep for its size, and deleting down to half
+        the largest size since the last full rebuild rebuilds the whole tree.
+        Rebuilds use the Day-Stout-Warren rotations, so they take linear time
+        and no extra space, and inserts cost amortized O(log n).
+        """
+        if factor <= 1:
+            raise ValueError(f"Height factor must be above 1, got {factor}")
+        if type(self).insert is not BST.insert or type(self)._balance_inserted is not BST._balance_inserted:
+            raise TypeError(f"{type(self).__name__} keeps its own balance")
+        if self.height_factor is None:
+            self.size = self.max_size = sum(self.depth_histogram())
+            self.rebuilds = 0
+        self.height_factor = factor
+        if self.root is not None and self.height() > factor * math.log2(max(self.size, 2)):
+            self._dsw_rebuild(self.root)
+    
+    def disable_rebalancing(self):
+        self.height_factor = None
+    
+    def _dsw_rebuild(self, top):
+        """Rebuild the subtree under top into a complete one in place with Day-Stout-Warren rotations"""
+        parent = top.parent
+        is_left = parent is not None and parent.left is top
+        anchor = self.node_class(None)  # pseudo-root, so rotations never touch the real parent
+        anchor.right = top
+        top.parent = anchor
+        # Right rotations turn the subtree into a vine hanging to the right, in key order
+        size = 0
+        node = top
+        while node is not None:
+            if node.left is not None:
+                node = node.left
+                self._rotate_up(node)
             else:
-                self._insert_recursive(node.left, key)
+                size += 1
+                node = node.right
+        # Left rotations fold the vine: first the bottom level, then halving until it is a tree
+        leaves = size + 1 - (1 << ((size + 1).bit_length() - 1))
+        self._compress(anchor, leaves)
+        size -= leaves
+        while size > 1:
+            size //= 2
+            self._compress(anchor, size)
+        subtree = anchor.right
+        subtree.parent = parent
+        if parent is None:
+            self.root = subtree
+        elif is_left:
+            parent.left = subtree
         else:
-            if node.right is None:
-                node.right = BSTNode(key)
-                node.right.parent = node
-            else:
-                self._insert_recursive(node.right, key)
+            parent.right = subtree
+        self._finger = None
+        self._shape_changed()
+        self.rebuilds += 1
+    
+    def _compress(self, anchor, count):
+        """Rotate every second node of the right spine under anchor up over its parent, count times"""
+        scanner = anchor
+        for _ in range(count):
+            node = scanner.right.right
+            self._rotate_up(node)
+            scanner = node
+    
+    def _subtree_size(self, node):
+        count = 0
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(self._children(node))
+        return count
+    
+    def _load_sorted(self, keys, values=None):
+        super()._load_sorted(keys, values)
+        if self.height_factor is not None:
+            self.size = self.max_size = len(keys)
+    
+    def _insert_leaf(self, key, finger=False):
+        """Plain BST insertion, from the finger if asked; returns the new node and its depth.
+        
+        The depth is counted from where the descent started, so it is only
+        the real depth when that was the root.
+        """
+        new_node = self.node_class(key)
+        if finger:
+            start, low, high = self._finger_start(key)
+        else:
+            start, low, high = self.root, None, None
+        depth = self._attach(new_node, start, low, high)
+        if start is self.root:
+            self._record_depth(depth, 1)
+        else:
+            self._shape_changed()
+        return new_node, depth
     
     def delete(self, key):
         node = self._search(self.root, key)
         if node is None:
             return False
         self._delete_node(node)
+        if self.height_factor is not None:
+            self.size -= 1
+            if 2 * self.size < self.max_size:
+                if self.root is not None:
+                    self._dsw_rebuild(self.root)
+                self.max_size = self.size
         return True
     
+    def search(self, key):
+        return self._search(self.root, key) is not None
+    
     def _search(self, node, key):
-        if node is None or node.key == key:
-            return node
-        if key < node.key:
-            return self._search(node.left, key)
-        return self._search(node.right, key)
+        while node is not None and node.key != key:
+            node = node.left if key < node.key else node.right
+        return node
+    
+    def _depth(self, node):
+        depth = 0
+        while node.parent is not None:
+            node = node.parent
+            depth += 1
+        return depth
     
     def _delete_node(self, node):
+        self._finger = None
         if node.left is None and node.right is None:
+            if self._depths is not None:
+                self._record_depth(self._depth(node), -1)
+            else:
+                self._imbalance = None
             self._replace_node(node, None)
         elif node.left is None:
+            self._shape_changed()
             self._replace_node(node, node.right)
         elif node.right is None:
+            self._shape_changed()
             self._replace_node(node, node.left)
         else:
             successor = self._find_min(node.right)
-            node.key = successor.key
+            node.key, node.value = successor.key, successor.value
             self._delete_node(successor)
     
     def _find_min(self, node):
@@ -207,6 +974,23 @@ class BST(Tree):
         if new_node is not None:
             new_node.parent = node.parent
     
+    def _rotate_up(self, node):
+        """Rotate node above its parent, keeping parent links and the root current"""
+        parent = node.parent
+        self._shape_changed()
+        if node is parent.left:
+            parent.left = node.right
+            if node.right is not None:
+                node.right.parent = parent
+            node.right = parent
+        else:
+            parent.right = node.left
+            if node.left is not None:
+                node.left.parent = parent
+            node.left = parent
+        self._replace_node(parent, node)
+        parent.parent = node
+    
     def to_string(self):
         lines = []
         self._build_tree_string(self.root, "", True, lines)
@@ -214,49 +998,71 @@ class BST(Tree):
     
     def _build_tree_string(self, node, prefix, is_tail, lines):
         if node is not None:
-            lines.append(prefix + ("└── " if is_tail else "├── ") + str(node.key))
+            lines.append(prefix + ("└── " if is_tail else "├── ") + self._label(node))
             children = [node.left, node.right]
             for i, child in enumerate(children):
                 if child is not None:
                     extension = "    " if is_tail else "│   "
                     self._build_tree_string(child, prefix + extension, i == len([c for c in children if c]) - 1, lines)
+    
+    def _label(self, node):
+        return str(node.key)
 
 # AVL Tree
 class AVLTree(Tree):
+    node_class = AVLNode
+    
     def insert(self, key):
-        self.root = self._insert(self.root, key)
+        self._insert_below(key, self.root)
     
-    def _insert(self, node, key):
-        if node is None:
-            return AVLNode(key)
-        
-        if key < node.key:
-            node.left = self._insert(node.left, key)
-            node.left.parent = node
+    def finger_insert(self, key):
+        """Insert from the finger and retrace the heights bottom-up through the parent links"""
+        self._insert_below(key, *self._finger_start(key))
+    
+    def _insert_node(self, key):
+        return self._insert_below(key, self.root)
+    
+    def _insert_below(self, key, start, low=None, high=None):
+        node = AVLNode(key)
+        from_root = start is self.root
+        depth = self._attach(node, start, low, high)
+        if self._rebalance_up(node.parent) or not from_root:
+            self._shape_changed()
         else:
-            node.right = self._insert(node.right, key)
-            node.right.parent = node
-        
-        node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
-        balance = self._get_balance(node)
-        
-        # Left Left
-        if balance > 1 and key < node.left.key:
-            return self._rotate_right(node)
-        # Right Right
-        if balance < -1 and key > node.right.key:
-            return self._rotate_left(node)
-        # Left Right
-        if balance > 1 and key > node.left.key:
-            node.left = self._rotate_left(node.left)
-            return self._rotate_right(node)
-        # Right Left
-        if balance < -1 and key < node.right.key:
-            node.right = self._rotate_right(node.right)
-            return self._rotate_left(node)
-        
+            self._record_depth(depth, 1)
         return node
     
+    def _rebalance_up(self, node):
+        """Update heights from node upwards after a leaf was added below it, rotating at most once.
+        
+        Returns True when it rotated.
+        """
+        while node is not None:
+            height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+            balance = self._get_balance(node)
+            if balance > 1 or balance < -1:
+                parent = node.parent
+                if balance > 1:
+                    if self._get_balance(node.left) < 0:
+                        node.left = self._rotate_left(node.left)
+                    subtree = self._rotate_right(node)
+                else:
+                    if self._get_balance(node.right) > 0:
+                        node.right = self._rotate_right(node.right)
+                    subtree = self._rotate_left(node)
+                if parent is None:
+                    self.root = subtree
+                elif parent.left is node:
+                    parent.left = subtree
+                else:
+                    parent.right = subtree
+                return True
+            if height == node.height:
+                return False
+            node.height = height
+            node = node.parent
+        return False
+    
     def _get_height(self, node):
         if node is None:
             return 0
@@ -294,8 +1100,37 @@ class AVLTree(Tree):
         return y
     
     def delete(self, key):
+        self._deleted = False
         self.root = self._delete(self.root, key)
-        return True
+        if self.root is not None:
+            self.root.parent = None
+        self._finger = None
+        self._shape_changed()
+        return self._deleted
+    
+    def search(self, key):
+        node = self.root
+        while node is not None and node.key != key:
+            node = node.left if key < node.key else node.right
+        return node is not None
+    
+    def height(self):
+        return self._get_height(self.root)
+    
+    def _load_sorted(self, keys, values=None):
+        super()._load_sorted(keys, values)
+        for node in reversed(self._level_order()):
+            node.height = 1 + max(self._get_height(node.left), self._get_height(node.right))
+    
+    def _scan_imbalance(self):
+        # Heights are stored on the nodes, so no recomputation is needed
+        worst = 0
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            worst = max(worst, abs(self._get_balance(node)))
+            stack.extend(self._children(node))
+        return worst
     
     def _delete(self, node, key):
         if node is None:
@@ -306,13 +1141,19 @@ class AVLTree(Tree):
         elif key > node.key:
             node.right = self._delete(node.right, key)
         else:
+            self._deleted = True
             if node.left is None:
                 return node.right
             elif node.right is None:
                 return node.left
             temp = self._find_min(node.right)
-            node.key = temp.key
+            node.key, node.value = temp.key, temp.value
             node.right = self._delete(node.right, temp.key)
+        # The child may have been replaced by one of its own children
+        if node.left is not None:
+            node.left.parent = node
+        if node.right is not None:
+            node.right.parent = node
         
         if node is None:
             return node
@@ -358,7 +1199,12 @@ class AVLTree(Tree):
 
 # Splay Tree
 class SplayTree(Tree):
+    search_mutates = True
+    unique_keys = True
+    node_class = SplayNode
+    
     def insert(self, key):
+        self._shape_changed()
         if self.root is None:
             self.root = SplayNode(key)
         else:
@@ -383,31 +1229,49 @@ class SplayTree(Tree):
                 self.root = new_node
     
     def _splay(self, node, key):
-        if node is None or node.key == key:
-            return node
+        # Walk down two levels per step, then do the zig-zig/zig-zag rotations
+        # on the way back up; an explicit stack keeps long chains from
+        # hitting the recursion limit
+        path = []
+        while node is not None and node.key != key:
+            if key < node.key:
+                if node.left is None:
+                    break
+                if key == node.left.key:
+                    node = self._rotate_right(node)
+                    break
+                path.append((node, "LL" if key < node.left.key else "LR"))
+                node = node.left.left if key < node.left.key else node.left.right
+            else:
+                if node.right is None:
+                    break
+                if key == node.right.key:
+                    node = self._rotate_left(node)
+                    break
+                path.append((node, "RR" if key > node.right.key else "RL"))
+                node = node.right.right if key > node.right.key else node.right.left
         
-        if key < node.key:
-            if node.left is None:
-                return node
-            if key < node.left.key:
-                node.left.left = self._splay(node.left.left, key)
-                node = self._rotate_right(node)
-            elif key > node.left.key:
-                node.left.right = self._splay(node.left.right, key)
-                if node.left.right:
-                    node.left = self._rotate_left(node.left)
-            return self._rotate_right(node) if node.left else node
-        else:
-            if node.right is None:
-                return node
-            if key > node.right.key:
-                node.right.right = self._splay(node.right.right, key)
-                node = self._rotate_left(node)
-            elif key < node.right.key:
-                node.right.left = self._splay(node.right.left, key)
-                if node.right.left:
-                    node.right = self._rotate_right(node.right)
-            return self._rotate_left(node) if node.right else node
+        while path:
+            parent, case = path.pop()
+            if case == "LL":
+                parent.left.left = node
+                parent = self._rotate_right(parent)
+                node = self._rotate_right(parent) if parent.left else parent
+            elif case == "LR":
+                parent.left.right = node
+                if parent.left.right:
+                    parent.left = self._rotate_left(parent.left)
+                node = self._rotate_right(parent) if parent.left else parent
+            elif case == "RR":
+                parent.right.right = node
+                parent = self._rotate_left(parent)
+                node = self._rotate_left(parent) if parent.right else parent
+            else:
+                parent.right.left = node
+                if parent.right.left:
+                    parent.right = self._rotate_right(parent.right)
+                node = self._rotate_left(parent) if parent.right else parent
+        return node
     
     def _rotate_right(self, node):
         left_child = node.left
@@ -432,6 +1296,7 @@ class SplayTree(Tree):
     def delete(self, key):
         if self.root is None:
             return False
+        self._shape_changed()
         self.root = self._splay(self.root, key)
         if self.root.key != key:
             return False
@@ -450,6 +1315,21 @@ class SplayTree(Tree):
                 right.parent = self.root
         return True
     
+    def search(self, key):
+        return self._find_node(key) is not None
+    
+    def _find_node(self, key):
+        if self.root is None:
+            return None
+        self._shape_changed()
+        self.root = self._splay(self.root, key)
+        return self.root if self.root.key == key else None
+    
+    def _insert_node(self, key):
+        # Inserting splays the key to the root
+        type(self).insert(self, key)
+        return self.root
+    
     def to_string(self):
         lines = []
         self._build_tree_string(self.root, "", True, lines)
@@ -466,28 +1346,11 @@ class SplayTree(Tree):
 
 # Red-Black Tree (simplified)
 class RBTree(BST):
-    def insert(self, key):
-        new_node = RBNode(key)
-        if self.root is None:
-            self.root = new_node
-            self.root.color = "BLACK"
-        else:
-            self._insert_node(self.root, new_node)
-            self._fix_insert(new_node)
-    
-    def _insert_node(self, root, node):
-        if node.key < root.key:
-            if root.left is None:
-                root.left = node
-                node.parent = root
-            else:
-                self._insert_node(root.left, node)
-        else:
-            if root.right is None:
-                root.right = node
-                node.parent = root
-            else:
-                self._insert_node(root.right, node)
+    node_class = RBNode
+    
+    def _balance_inserted(self, node):
+        # Recoloring keeps the depths _insert_leaf recorded; the rotations mark them stale
+        self._fix_insert(node)
     
     def _fix_insert(self, node):
         while node != self.root and node.parent.color == "RED":
@@ -521,7 +1384,77 @@ class RBTree(BST):
                     self._rotate_left_rb(node.parent.parent)
         self.root.color = "BLACK"
     
+    def _delete_node(self, node):
+        """Unlink node, then restore the colors if a black node left its path short"""
+        self._finger = None
+        if node.left is not None and node.right is not None:
+            successor = self._find_min(node.right)
+            node.key, node.value = successor.key, successor.value
+            node = successor
+        child = node.left if node.left is not None else node.right
+        parent = node.parent
+        if child is not None:
+            self._shape_changed()
+        elif self._depths is not None:
+            self._record_depth(self._depth(node), -1)
+        else:
+            self._imbalance = None
+        self._replace_node(node, child)
+        if node.color == "BLACK":
+            self._fix_delete(child, parent)
+    
+    def _fix_delete(self, node, parent):
+        # node (None for an empty leaf) is one black short; push the deficit up or fix it with rotations
+        while node is not self.root and (node is None or node.color == "BLACK"):
+            if node is parent.left:
+                sibling = parent.right
+                if sibling.color == "RED":
+                    sibling.color = "BLACK"
+                    parent.color = "RED"
+                    self._rotate_left_rb(parent)
+                    sibling = parent.right
+                if (sibling.left is None or sibling.left.color == "BLACK") and \
+                        (sibling.right is None or sibling.right.color == "BLACK"):
+                    sibling.color = "RED"
+                    node, parent = parent, parent.parent
+                else:
+                    if sibling.right is None or sibling.right.color == "BLACK":
+                        sibling.left.color = "BLACK"
+                        sibling.color = "RED"
+                        self._rotate_right_rb(sibling)
+                        sibling = parent.right
+                    sibling.color = parent.color
+                    parent.color = "BLACK"
+                    sibling.right.color = "BLACK"
+                    self._rotate_left_rb(parent)
+                    node = self.root
+            else:
+                sibling = parent.left
+                if sibling.color == "RED":
+                    sibling.color = "BLACK"
+                    parent.color = "RED"
+                    self._rotate_right_rb(parent)
+                    sibling = parent.left
+                if (sibling.left is None or sibling.left.color == "BLACK") and \
+                        (sibling.right is None or sibling.right.color == "BLACK"):
+                    sibling.color = "RED"
+                    node, parent = parent, parent.parent
+                else:
+                    if sibling.left is None or sibling.left.color == "BLACK":
+                        sibling.right.color = "BLACK"
+                        sibling.color = "RED"
+                        self._rotate_left_rb(sibling)
+                        sibling = parent.left
+                    sibling.color = parent.color
+                    parent.color = "BLACK"
+                    sibling.left.color = "BLACK"
+                    self._rotate_right_rb(parent)
+                    node = self.root
+        if node is not None:
+            node.color = "BLACK"
+    
     def _rotate_left_rb(self, node):
+        self._shape_changed()
         right = node.right
         node.right = right.left
         if right.left:
@@ -537,6 +1470,7 @@ class RBTree(BST):
         node.parent = right
     
     def _rotate_right_rb(self, node):
+        self._shape_changed()
         left = node.left
         node.left = left.right
         if left.right:
@@ -551,6 +1485,18 @@ class RBTree(BST):
         left.right = node
         node.parent = left
     
+    def _load_sorted(self, keys, values=None):
+        super()._load_sorted(keys, values)
+        # Every root-to-leaf path has the same number of levels except for the
+        # deepest one, so coloring that level red keeps the black heights equal
+        nodes = self._level_order()
+        deepest = len(keys).bit_length() - 1
+        for node in nodes:
+            node.color = "BLACK"
+        if deepest > 0:
+            for node in nodes[(1 << deepest) - 1:]:
+                node.color = "RED"
+    
     def to_string(self):
         lines = []
         self._build_tree_string_rb(self.root, "", True, lines)
@@ -568,25 +1514,41 @@ class RBTree(BST):
 
 # 2-3 Tree (simplified)
 class Tree23(Tree):
+    unique_keys = True
+    def __init__(self):
+        super().__init__()
+        self._keeps_values = False  # True once a value is set; until then nodes have no values lists
+    
     def insert(self, key):
+        self._insert_value(key, None)
+    
+    def _insert_value(self, key, value):
+        self._finger = None  # splits replace the nodes on the path
         if self.root is None:
             self.root = Node23()
             self.root.keys = [key]
+            if self._keeps_values:
+                self.root.values = [value]
+            self._count_level(0, 1)
         else:
-            result = self._insert(self.root, key)
+            top = len(self._depths) - 1 if self._depths is not None else 0
+            result = self._insert(self.root, key, value, top)
             if result:
                 self.root = result
     
-    def _insert(self, node, key):
+    def _insert(self, node, key, value, level):
         # Don't insert duplicates
         if key in node.keys:
             return None
         
         if node.is_leaf():
-            node.keys.append(key)
-            node.keys.sort()
+            i = bisect.bisect(node.keys, key)
+            node.keys.insert(i, key)
+            if self._keeps_values:
+                node.values.insert(i, value)
+            self._count_level(level, 1)
             if len(node.keys) > 2:
-                return self._split(node)
+                return self._split(node, level)
             return None
         else:
             # Find correct child
@@ -602,30 +1564,33 @@ class Tree23(Tree):
             if node.children[i] is None:
                 node.children[i] = Node23()
                 node.children[i].parent = node
+                if self._keeps_values:
+                    node.children[i].values = []
             
-            result = self._insert(node.children[i], key)
+            result = self._insert(node.children[i], key, value, level - 1)
             
             if result:
-                # Child was split, need to insert into this node
-                mid_key = result.keys[0]
-                node.keys.append(mid_key)
-                node.keys.sort()
+                # Child was split, its middle key goes between the keys around child i
+                node.keys.insert(i, result.keys[0])
+                if self._keeps_values:
+                    node.values.insert(i, result.values[0])
                 
                 # Update children
-                key_index = node.keys.index(mid_key)
-                node.children[key_index] = result.children[0]
-                node.children.insert(key_index + 1, result.children[1])
+                node.children[i] = result.children[0]
+                node.children.insert(i + 1, result.children[1])
                 
                 result.children[0].parent = node
                 result.children[1].parent = node
                 
                 if len(node.keys) > 2:
-                    return self._split(node)
+                    return self._split(node, level)
             
             return None
     
-    def _split(self, node):
+    def _split(self, node, level):
         mid_key = node.keys[1]
+        self._count_level(level, -1)
+        self._count_level(level + 1, 1)
         
         left = Node23()
         left.keys = [node.keys[0]]
@@ -647,13 +1612,323 @@ class Tree23(Tree):
         new_parent = Node23()
         new_parent.keys = [mid_key]
         new_parent.children = [left, right]
+        if self._keeps_values:
+            left.values = [node.values[0]]
+            new_parent.values = [node.values[1]]
+            right.values = [node.values[2]]
         left.parent = new_parent
         right.parent = new_parent
         
         return new_parent
     
+    def finger_insert(self, key):
+        """Insert from the leaf of the previous finger_insert, splitting bottom-up through the parent links"""
+        if self.root is None:
+            return type(self).insert(self, key)
+        node, low, high = self._finger_start(key)
+        while key not in node.keys:
+            if node.is_leaf():
+                break
+            i = 0
+            while i < len(node.keys) and key > node.keys[i]:
+                i += 1
+            if i > 0:
+                low = node.keys[i - 1]
+            if i < len(node.keys):
+                high = node.keys[i]
+            node = node.children[i]
+        else:
+            return None
+        i = bisect.bisect(node.keys, key)
+        node.keys.insert(i, key)
+        if self._keeps_values:
+            node.values.insert(i, None)
+        self._count_level(0, 1)
+        self._finger, self._finger_low, self._finger_high = node, low, high
+        if len(node.keys) > 2:
+            mid = node.keys[1]
+            right = self._split_up(node)
+            # The leaf kept only its smallest key
+            if key > mid:
+                self._finger, self._finger_low = right, mid
+            else:
+                self._finger_high = mid
+    
+    def _finger_start(self, key):
+        """(node, low, high) to start a descent for key from, with low < key < high in the subtree.
+        
+        Like the binary version, but the climb looks at the separator keys
+        on either side of the child it comes from.
+        """
+        node = self._finger
+        if node is None:
+            return self.root, None, None
+        low, high = self._finger_low, self._finger_high
+        if (low is None or low < key) and (high is None or key < high):
+            return node, low, high
+        upward = key > node.keys[-1]
+        while node.parent is not None:
+            parent = node.parent
+            i = parent.children.index(node)
+            if upward:
+                if i < len(parent.keys) and key < parent.keys[i]:
+                    return node, low, parent.keys[i]
+            elif i > 0 and key > parent.keys[i - 1]:
+                return node, parent.keys[i - 1], high
+            node = parent
+        return node, None, None
+    
+    def _split_up(self, node):
+        """Split overfull nodes from node upwards; each keeps its left half.
+        
+        Returns the node created for the right half of the first split.
+        """
+        first = None
+        level = 0
+        keeps_values = self._keeps_values
+        while len(node.keys) > 2:
+            mid = node.keys[1]
+            self._count_level(level, -1)
+            self._count_level(level + 1, 1)
+            level += 1
+            right = Node23()
+            right.keys = node.keys[2:]
+            node.keys = node.keys[:1]
+            if keeps_values:
+                mid_value = node.values[1]
+                right.values = node.values[2:]
+                node.values = node.values[:1]
+            if node.children:
+                right.children = node.children[2:]
+                node.children = node.children[:2]
+                for child in right.children:
+                    child.parent = right
+            first = first or right
+            parent = node.parent
+            if parent is None:
+                parent = Node23()
+                parent.keys = [mid]
+                if keeps_values:
+                    parent.values = [mid_value]
+                parent.children = [node, right]
+                node.parent = right.parent = parent
+                self.root = parent
+                break
+            i = parent.children.index(node)
+            parent.keys.insert(i, mid)
+            if keeps_values:
+                parent.values.insert(i, mid_value)
+            parent.children.insert(i + 1, right)
+            right.parent = parent
+            node = parent
+        return first
+    
     def delete(self, key):
-        # Simplified deletion - not fully implemented
+        node = self.root
+        while node is not None and key not in node.keys:
+            if node.is_leaf():
+                return False
+            i = 0
+            while i < len(node.keys) and key > node.keys[i]:
+                i += 1
+            node = node.children[i]
+        if node is None:
+            return False
+        self._finger = None
+        i = node.keys.index(key)
+        if not node.is_leaf():
+            # Swap in the predecessor, which always sits in a leaf
+            leaf = node.children[i]
+            while not leaf.is_leaf():
+                leaf = leaf.children[-1]
+            node.keys[i] = leaf.keys[-1]
+            if self._keeps_values:
+                node.values[i] = leaf.values[-1]
+            node, i = leaf, len(leaf.keys) - 1
+        node.keys.pop(i)
+        if self._keeps_values:
+            node.values.pop(i)
+        self._count_level(0, -1)
+        self._fix_underflow(node)
+        return True
+    
+    def _fix_underflow(self, node):
+        """Refill an emptied node from a 3-node sibling, or merge it into a 2-node sibling"""
+        level = 0
+        keeps_values = self._keeps_values
+        while not node.keys:
+            parent = node.parent
+            if parent is None:
+                self.root = node.children[0] if node.children else None
+                if self.root is not None:
+                    self.root.parent = None
+                return
+            i = parent.children.index(node)
+            left = parent.children[i - 1] if i > 0 else None
+            right = parent.children[i + 1] if i + 1 < len(parent.children) else None
+            if left is not None and len(left.keys) == 2:
+                node.keys.append(parent.keys[i - 1])
+                parent.keys[i - 1] = left.keys.pop()
+                if keeps_values:
+                    node.values.append(parent.values[i - 1])
+                    parent.values[i - 1] = left.values.pop()
+                if left.children:
+                    child = left.children.pop()
+                    child.parent = node
+                    node.children.insert(0, child)
+                return
+            if right is not None and len(right.keys) == 2:
+                node.keys.append(parent.keys[i])
+                parent.keys[i] = right.keys.pop(0)
+                if keeps_values:
+                    node.values.append(parent.values[i])
+                    parent.values[i] = right.values.pop(0)
+                if right.children:
+                    child = right.children.pop(0)
+                    child.parent = node
+                    node.children.append(child)
+                return
+            if left is not None:
+                left.keys.append(parent.keys.pop(i - 1))
+                if keeps_values:
+                    left.values.append(parent.values.pop(i - 1))
+                left.children.extend(node.children)
+                for child in node.children:
+                    child.parent = left
+            else:
+                right.keys.insert(0, parent.keys.pop(i))
+                if keeps_values:
+                    right.values.insert(0, parent.values.pop(i))
+                right.children[:0] = node.children
+                for child in node.children:
+                    child.parent = right
+            parent.children.pop(i)
+            # The parent's key moved down a level
+            self._count_level(level + 1, -1)
+            self._count_level(level, 1)
+            node = parent
+            level += 1
+    
+    def _load_sorted(self, keys, values=None):
+        # Use the lowest height that can hold the keys and spread them evenly
+        height = 1
+        while 3 ** height - 1 < len(keys):
+            height += 1
+        self._keeps_values = values is not None
+        self.root = self._build_sorted(keys, values, 0, len(keys), height, None) if keys else None
+        self._finger = None
+        self._shape_changed()
+    
+    def _build_sorted(self, keys, values, low, high, height, parent):
+        node = Node23()
+        node.parent = parent
+        if values is not None:
+            node.values = []
+        if height == 1:
+            node.keys = keys[low:high]
+            if values is not None:
+                node.values = values[low:high]
+            return node
+        count = high - low
+        ways = 2 if count - 1 <= 2 * (3 ** (height - 1) - 1) else 3
+        spread = count - (ways - 1)
+        start = low
+        for j in range(ways):
+            size = spread // ways + (j < spread % ways)
+            node.children.append(self._build_sorted(keys, values, start, start + size, height - 1, node))
+            start += size
+            if j < ways - 1:
+                node.keys.append(keys[start])
+                if values is not None:
+                    node.values.append(values[start])
+                start += 1
+        return node
+    
+    # Shape statistics: every leaf sits on the same level, so the imbalance is always
+    # 0, and _depths holds the keys per level counted from the leaves, which only
+    # changes where a key is added or removed or a split or merge moves one
+    def _shape_changed(self):
+        self._depths = None
+    
+    def depth_histogram(self):
+        if self._depths is None:
+            super().depth_histogram()
+            self._depths.reverse()
+        return self._depths[::-1]
+    
+    def _count_level(self, level, delta):
+        if self._depths is None:
+            return
+        if level == len(self._depths):
+            self._depths.append(0)
+        self._depths[level] += delta
+        while self._depths and self._depths[-1] == 0:
+            self._depths.pop()
+    
+    def height(self):
+        # All leaves sit on the same level, so the leftmost path is enough
+        levels = 0
+        node = self.root
+        while node is not None:
+            levels += 1
+            node = node.children[0] if node.children else None
+        return levels
+    
+    # Values stored with keys
+    def get_value(self, key, default=None):
+        node, i = self._find_entry(key)
+        if node is None:
+            return default
+        return node.values[i] if self._keeps_values else None
+    
+    def set_value(self, key, value):
+        self._check_values()
+        if not self._keeps_values:
+            self._start_values()
+        node, i = self._find_entry(key)
+        if node is None:
+            self._insert_value(key, value)
+            return True
+        node.values[i] = value
+        return False
+    
+    def pop_value(self, key, default=None):
+        node, i = self._find_entry(key)
+        if node is None:
+            return default
+        value = node.values[i] if self._keeps_values else None
+        type(self).delete(self, key)
+        return value
+    
+    def _start_values(self):
+        """Give every node a values list of Nones, so key-only trees pay for none of them"""
+        self._keeps_values = True
+        nodes = [self.root] if self.root is not None else []
+        for node in nodes:
+            node.values = [None] * len(node.keys)
+            nodes.extend(node.children)
+    
+    def _find_entry(self, key):
+        """(node, index) of key, or (None, None) when it is not in the tree"""
+        node = self.root
+        while node is not None:
+            i = bisect.bisect_left(node.keys, key)
+            if i < len(node.keys) and node.keys[i] == key:
+                return node, i
+            node = node.children[i] if i < len(node.children) else None
+        return None, None
+    
+    def search(self, key):
+        node = self.root
+        while node is not None:
+            if key in node.keys:
+                return True
+            if node.is_leaf():
+                return False
+            i = 0
+            while i < len(node.keys) and key > node.keys[i]:
+                i += 1
+            node = node.children[i] if i < len(node.children) else None
         return False
     
     def to_string(self):
@@ -669,6 +1944,361 @@ class Tree23(Tree):
                     extension = "    " if is_tail else "│   "
                     self._build_tree_string_23(child, prefix + extension, i == len(node.children) - 1, lines)
 
+# Treap
+class Treap(BST):
+    node_class = TreapNode
+    
+    def _balance_inserted(self, node):
+        # Rotate the new node up until the priorities form a max-heap again
+        while node.parent is not None and node.priority > node.parent.priority:
+            self._rotate_up(node)
+    
+    def delete(self, key):
+        node = self._search(self.root, key)
+        if node is None:
+            return False
+        # Rotate the node down below its higher priority child until at most one child is left
+        while node.left is not None and node.right is not None:
+            self._rotate_up(node.left if node.left.priority > node.right.priority else node.right)
+        self._delete_node(node)
+        return True
+    
+    def _load_sorted(self, keys, values=None):
+        super()._load_sorted(keys, values)
+        # Handing out sorted random priorities in level order keeps the heap order
+        priorities = sorted((random.random() for _ in keys), reverse=True)
+        for node, priority in zip(self._level_order(), priorities):
+            node.priority = priority
+    
+    def _label(self, node):
+        return f"{node.key}(p={node.priority:.2f})"
+
+# Scapegoat Tree
+class ScapegoatTree(BST):
+    alpha = 0.7  # A subtree may hold at most this fraction of its parent's nodes
+    
+    def __init__(self):
+        super().__init__()
+        self.size = 0
+        self.max_size = 0
+        self.rebuilds = 0
+    
+    # Rebuilds are triggered by the depth of the new node, which a finger start does not know,
+    # and happen in insert
+    finger_insert = Tree.finger_insert
+    _insert_node = Tree._insert_node
+    
+    def insert(self, key):
+        node, depth = self._insert_leaf(key)
+        self.size += 1
+        self.max_size = max(self.max_size, self.size)
+        if depth <= math.log(self.size, 1 / self.alpha):
+            return
+        # Too deep: some ancestor is weight-unbalanced, rebuild the lowest one
+        size = 1
+        while node.parent is not None:
+            parent = node.parent
+            sibling = parent.right if node is parent.left else parent.left
+            parent_size = size + 1 + self._subtree_size(sibling)
+            if size > self.alpha * parent_size:
+                self._rebuild(parent)
+                return
+            node, size = parent, parent_size
+    
+    def delete(self, key):
+        if not super().delete(key):
+            return False
+        self.size -= 1
+        if self.size < self.alpha * self.max_size:
+            if self.root is not None:
+                self._rebuild(self.root)
+            self.max_size = self.size
+        return True
+    
+    def _rebuild(self, node):
+        """Relink the subtree under node into a perfectly balanced one"""
+        parent = node.parent
+        is_left = parent is not None and parent.left is node
+        nodes = []
+        stack = []
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            nodes.append(node)
+            node = node.right
+        subtree = self._link_balanced(nodes, 0, len(nodes), parent)
+        if parent is None:
+            self.root = subtree
+        elif is_left:
+            parent.left = subtree
+        else:
+            parent.right = subtree
+        self.rebuilds += 1
+        self._shape_changed()
+    
+    def _load_sorted(self, keys, values=None):
+        super()._load_sorted(keys, values)
+        self.size = self.max_size = len(keys)
+
+# WAVL Tree (weak AVL, rank balanced)
+class WAVLTree(BST):
+    """Every rank difference between a node and its child is 1 or 2 and leaves have rank 0.
+    
+    Without deletions the tree stays an AVL tree; deletions take at most two
+    rotations and never cascade rotations up the tree.
+    """
+    node_class = WAVLNode
+    
+    @staticmethod
+    def _rank(node):
+        return node.rank if node is not None else -1
+    
+    def _balance_inserted(self, node):
+        rank = self._rank
+        parent = node.parent
+        # Walk up while node is a 0-child of parent
+        while parent is not None and parent.rank == node.rank:
+            sibling = parent.right if node is parent.left else parent.left
+            if parent.rank - rank(sibling) == 1:
+                parent.rank += 1
+                node, parent = parent, parent.parent
+                continue
+            inner = node.right if node is parent.left else node.left
+            if node.rank - rank(inner) == 2:
+                self._rotate_up(node)
+                parent.rank -= 1
+            else:
+                self._rotate_up(inner)
+                self._rotate_up(inner)
+                inner.rank += 1
+                node.rank -= 1
+                parent.rank -= 1
+            break
+    
+    def delete(self, key):
+        node = self._search(self.root, key)
+        if node is None:
+            return False
+        if node.left is not None and node.right is not None:
+            successor = self._find_min(node.right)
+            node.key, node.value = successor.key, successor.value
+            node = successor
+        parent = node.parent
+        is_left = parent is not None and parent.left is node
+        self._delete_node(node)
+        if parent is not None and parent.left is None and parent.right is None:
+            # A 2,2 leaf is not allowed
+            parent.rank = 0
+            node, parent = parent, parent.parent
+            is_left = parent is not None and parent.left is node
+        self._fix_delete(parent, is_left)
+        return True
+    
+    def _fix_delete(self, parent, is_left):
+        rank = self._rank
+        # Walk up while the child on the is_left side of parent is a 3-child
+        while parent is not None:
+            node = parent.left if is_left else parent.right
+            if parent.rank - rank(node) != 3:
+                return
+            sibling = parent.right if is_left else parent.left
+            if parent.rank - sibling.rank == 2:
+                parent.rank -= 1
+            elif rank(sibling.left) == rank(sibling.right) == sibling.rank - 2:
+                parent.rank -= 1
+                sibling.rank -= 1
+            else:
+                outer = sibling.right if is_left else sibling.left
+                if sibling.rank - rank(outer) == 1:
+                    self._rotate_up(sibling)
+                    sibling.rank += 1
+                    parent.rank -= 1
+                    if parent.left is None and parent.right is None:
+                        parent.rank = 0
+                else:
+                    inner = sibling.left if is_left else sibling.right
+                    self._rotate_up(inner)
+                    self._rotate_up(inner)
+                    inner.rank += 2
+                    sibling.rank -= 1
+                    parent.rank -= 2
+                return
+            node, parent = parent, parent.parent
+            is_left = parent is not None and parent.left is node
+    
+    def _load_sorted(self, keys, values=None):
+        super()._load_sorted(keys, values)
+        rank = self._rank
+        for node in reversed(self._level_order()):
+            node.rank = 1 + max(rank(node.left), rank(node.right))
+    
+    def _label(self, node):
+        return f"{node.key}(r={node.rank})"
+
+# Skip List
+class SkipList(Tree):
+    """Sorted linked levels where each node reaches the next level with probability p.
+    
+    root is an implied binary tree over the keys (the Cartesian tree of the
+    node levels, tallest and leftmost on top) so the shared classification and
+    statistics helpers work unchanged. It is made of separate BSTNodes, built
+    only when root is read after a change, so the list's own nodes carry no
+    tree links.
+    """
+    max_level = 32
+    p = 0.5
+    
+    def __init__(self):
+        super().__init__()
+        self.head = SkipNode(None, self.max_level)
+        self.level = 1
+        self.size = 0
+    
+    @property
+    def root(self):
+        if self._view_stale:
+            self._build_view()
+        return self._root
+    
+    @root.setter
+    def root(self, node):
+        self._root = node
+        self._view_stale = False
+    
+    def _build_view(self):
+        stack = []  # (view node, level) down the right spine
+        node = self.head.forward[0]
+        while node is not None:
+            view = BSTNode(node.key)
+            if node.value is not None:
+                view.value = node.value
+            level = len(node.forward)
+            last = None
+            while stack and stack[-1][1] < level:
+                last = stack.pop()[0]
+            view.left = last
+            if last is not None:
+                last.parent = view
+            if stack:
+                stack[-1][0].right = view
+                view.parent = stack[-1][0]
+            stack.append((view, level))
+            node = node.forward[0]
+        self.root = stack[0][0] if stack else None
+    
+    def _changed(self):
+        self._root = None  # drop the old view rather than keep it alive until the next read
+        self._view_stale = True
+        self._shape_changed()
+    
+    def _predecessors(self, key):
+        """Last node before key on every level"""
+        update = [self.head] * self.max_level
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+        return update
+    
+    def insert(self, key):
+        self._insert_node(key)
+    
+    def _insert_node(self, key):
+        update = self._predecessors(key)
+        level = 1
+        while level < self.max_level and random.random() < self.p:
+            level += 1
+        self.level = max(self.level, level)
+        new_node = SkipNode(key, level)
+        for i in range(level):
+            new_node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new_node
+        self.size += 1
+        self._changed()
+        return new_node
+    
+    def delete(self, key):
+        update = self._predecessors(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(len(node.forward)):
+            update[i].forward[i] = node.forward[i]
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+        self.size -= 1
+        self._changed()
+        return True
+    
+    def search(self, key):
+        return self._find_node(key) is not None
+    
+    def _find_node(self, key):
+        """First node holding key, or None; walks the levels instead of the implied tree"""
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+        node = node.forward[0]
+        return node if node is not None and node.key == key else None
+    
+    def _irange(self, low, high, values=False):
+        node = self.head
+        if low is not None:
+            for i in range(self.level - 1, -1, -1):
+                while node.forward[i] is not None and node.forward[i].key < low:
+                    node = node.forward[i]
+        node = node.forward[0]
+        while node is not None and (high is None or node.key <= high):
+            yield (node.key, node.value) if values else node.key
+            node = node.forward[0]
+    
+    def _load_sorted(self, keys, values=None):
+        self.head = SkipNode(None, self.max_level)
+        last = [self.head] * self.max_level
+        self.level = 1
+        for j, key in enumerate(keys):
+            level = 1
+            while level < self.max_level and random.random() < self.p:
+                level += 1
+            self.level = max(self.level, level)
+            node = SkipNode(key, level)
+            if values is not None:
+                node.value = values[j]
+            for i in range(level):
+                last[i].forward[i] = node
+                last[i] = node
+        self.size = len(keys)
+        self._changed()
+    
+    def to_string(self):
+        if self.size == 0:
+            return ""
+        lines = []
+        for i in range(self.level - 1, -1, -1):
+            keys = []
+            node = self.head.forward[i]
+            while node is not None:
+                keys.append(str(node.key))
+                node = node.forward[i]
+            lines.append(f"L{i}: " + " -> ".join(keys))
+        return "\n".join(lines)
+
+TREE_TYPES = {
+    "BST": BST,
+    "RBTree": RBTree,
+    "AVLTree": AVLTree,
+    "SplayTree": SplayTree,
+    "Tree23": Tree23,
+    "Treap": Treap,
+    "ScapegoatTree": ScapegoatTree,
+    "WAVLTree": WAVLTree,
+    "SkipList": SkipList
+}
+
 def generate_test_cases():
     """Generate three test cases"""
     # Case 1: 100 random numbers
@@ -688,8 +2318,7 @@ def test_tree(tree_class, name, data):
     
     # Insertion timing
     start = time.time()
-    for key in data:
-        tree.insert(key)
+    tree.insert_many(data)
     insert_time = time.time() - start
     
     # Get tree structure
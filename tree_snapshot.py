@@ -0,0 +1,197 @@
+"""
+Frozen, read-optimized tree snapshots in Eytzinger or van Emde Boas layout
+"""
+import numpy as np
+
+LAYOUTS = ("eytzinger", "veb")
+
+def _subtree_sizes(n):
+    """Subtree sizes of the complete binary tree with BFS indices 1..n"""
+    size = np.zeros(2 * n + 2, dtype=np.int64)
+    top = n
+    while top >= 1:
+        bottom = top // 2 + 1
+        idx = np.arange(bottom, top + 1)
+        size[idx] = 1 + size[2 * idx] + size[2 * idx + 1]
+        top = bottom - 1
+    return size
+
+def _inorder_ranks(n):
+    """Sorted position of every BFS index 1..n of the complete binary tree"""
+    size = _subtree_sizes(n)
+    rank = np.zeros(n + 1, dtype=np.int64)
+    if n == 0:
+        return rank
+    rank[1] = size[2]
+    level = np.array([1], dtype=np.int64)
+    while level.size:
+        left = 2 * level
+        left = left[left <= n]
+        rank[left] = rank[left // 2] - 1 - size[2 * left + 1]
+        right = 2 * level + 1
+        right = right[right <= n]
+        rank[right] = rank[right // 2] + 1 + size[2 * right]
+        level = np.concatenate((left, right))
+    return rank
+
+def _veb_order(roots, height):
+    """van Emde Boas order of the perfect subtrees of the given height below each root.
+    
+    Returns an array of shape (len(roots), 2**height - 1) holding BFS indices.
+    """
+    if height == 1:
+        return roots[:, None]
+    top_height = height // 2
+    bottom_height = height - top_height
+    top = _veb_order(roots, top_height)
+    first_leaf = roots * (1 << (top_height - 1))
+    leaves = first_leaf[:, None] + np.arange(1 << (top_height - 1))
+    bottom_roots = (2 * leaves[:, :, None] + np.arange(2)).reshape(-1)
+    bottom = _veb_order(bottom_roots, bottom_height).reshape(len(roots), -1)
+    return np.concatenate((top, bottom), axis=1)
+
+class FrozenTree:
+    """Immutable sorted-key snapshot laid out for cache-friendly searching.
+    
+    ``eytzinger`` stores the implicit complete tree in BFS order; ``veb``
+    stores the same tree in van Emde Boas order, so every subtree of height
+    2**k occupies a contiguous block. Both keep the keys in layout order in
+    ``slots``, the ``left``/``right`` child slot of each (-1 when missing) and
+    the sorted position of each slot in ``slot_rank``.
+    """
+    def __init__(self, keys, layout="eytzinger"):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
+        self.layout = layout
+        self.sorted_keys = np.array(list(keys))
+        n = self.sorted_keys.size
+        self.size = n
+        
+        bfs_rank = _inorder_ranks(n)
+        if layout == "eytzinger":
+            bfs = np.arange(1, n + 1)
+        else:
+            height = max(1, int(n).bit_length())
+            bfs = _veb_order(np.array([1], dtype=np.int64), height).reshape(-1)
+            bfs = bfs[bfs <= n]
+        position = np.full(2 * n + 2, -1, dtype=np.int64)
+        position[bfs] = np.arange(n)
+        
+        self.slots = self.sorted_keys[bfs_rank[bfs]]
+        self.slot_rank = bfs_rank[bfs]
+        self.left = position[2 * bfs]
+        self.right = position[2 * bfs + 1]
+        self.depth = int(n).bit_length()
+        if layout == "eytzinger":
+            self._init_batch_search()
+        for array in (self.sorted_keys, self.slots, self.slot_rank, self.left, self.right):
+            array.setflags(write=False)
+        
+        # Plain lists are faster than NumPy scalars for one probe at a time
+        self._keys = self.slots.tolist()
+        self._left = self.left.tolist()
+        self._right = self.right.tolist()
+        self._rank = self.slot_rank.tolist()
+    
+    def _init_batch_search(self):
+        """1-based Eytzinger copy for search_many.
+        
+        Numeric keys are padded with the largest value of their type up to a
+        perfect tree, so every probe takes exactly ``depth`` steps and the
+        loop needs no bounds masking.
+        """
+        n = self.size
+        dtype = self.sorted_keys.dtype
+        if np.issubdtype(dtype, np.integer):
+            pad = np.iinfo(dtype).max
+        elif np.issubdtype(dtype, np.floating):
+            pad = np.inf
+        else:
+            pad = None
+        self._padded = pad is not None and n > 0
+        size = (1 << self.depth) - 1 if self._padded else n
+        keys = np.concatenate((self.sorted_keys, np.full(size - n, pad, dtype=dtype))) if self._padded else self.sorted_keys
+        ranks = _inorder_ranks(size)[1:]
+        self._eytzinger = np.concatenate((keys[:1], keys[ranks]))
+        self._eytzinger_rank = np.concatenate(([n], np.minimum(ranks, n)))
+    
+    def __len__(self):
+        return self.size
+    
+    def __contains__(self, key):
+        return self.search(key)
+    
+    def _bound(self, key, upper):
+        """Sorted position of the first key >= key (> key when upper)"""
+        keys, left, right = self._keys, self._left, self._right
+        pos = 0 if self.size else -1
+        best = -1
+        while pos >= 0:
+            k = keys[pos]
+            if k > key or (k == key and not upper):
+                best = pos
+                pos = left[pos]
+            else:
+                pos = right[pos]
+        return self._rank[best] if best >= 0 else self.size
+    
+    def search(self, key):
+        """True when key is in the snapshot"""
+        keys, left, right = self._keys, self._left, self._right
+        pos = 0 if self.size else -1
+        while pos >= 0:
+            k = keys[pos]
+            if k == key:
+                return True
+            pos = left[pos] if key < k else right[pos]
+        return False
+    
+    def rank(self, key):
+        """Number of keys strictly smaller than key"""
+        return self._bound(key, False)
+    
+    def range(self, low, high):
+        """Sorted keys k with low <= k <= high"""
+        return self.sorted_keys[self._bound(low, False):self._bound(high, True)]
+    
+    def search_many(self, probes):
+        """Look up a batch of keys at once.
+        
+        Returns ``(hits, positions)``: a boolean array telling which probes are
+        present and the rank (sorted position of the first key >= probe) of each.
+        """
+        probes = np.asarray(probes)
+        n = self.size
+        if n == 0:
+            return np.zeros(probes.shape, dtype=bool), np.zeros(probes.shape, dtype=np.int64)
+        if self.layout == "eytzinger":
+            keys = self._eytzinger
+            i = np.ones(probes.shape, dtype=np.int64)
+            if self._padded:
+                for _ in range(self.depth):
+                    i = 2 * i + (keys[i] < probes)
+            else:
+                for _ in range(self.depth):
+                    step = 2 * i + (keys[np.minimum(i, n)] < probes)
+                    i = np.where(i <= n, step, i)
+            # Drop the trailing right turns plus one left turn to land on the lower bound
+            lowest_zero = ~i & (i + 1)
+            found = i // (2 * lowest_zero)
+            positions = self._eytzinger_rank[found]
+            hits = (positions < n) & (keys[found] == probes)
+            return hits, positions
+        
+        keys, left, right = self.slots, self.left, self.right
+        pos = np.zeros(probes.shape, dtype=np.int64)
+        best = np.full(probes.shape, -1, dtype=np.int64)
+        for _ in range(self.depth):
+            active = pos >= 0
+            safe = np.maximum(pos, 0)
+            go_left = keys[safe] >= probes
+            best = np.where(active & go_left, pos, best)
+            pos = np.where(active, np.where(go_left, left[safe], right[safe]), -1)
+        found = best >= 0
+        safe = np.maximum(best, 0)
+        positions = np.where(found, self.slot_rank[safe], n)
+        hits = found & (keys[safe] == probes)
+        return hits, positions
@@ -0,0 +1,178 @@
+"""
+Binary operation traces - record tree operations and replay them against every tree type
+
+A trace file is the 8 byte magic b"TREETRC1" followed by fixed 10 byte
+little-endian records: uint8 op (1 insert, 2 delete, 3 search), int64 key,
+int8 result (1 true, 0 false, -1 none). Traces captured elsewhere only need
+to follow the same layout to be replayed.
+"""
+import argparse
+import json
+import random
+import struct
+import time
+from tree_simulator import TREE_TYPES, generate_test_cases
+from tree_latency import LatencyRecorder, format_ns
+
+MAGIC = b"TREETRC1"
+RECORD = struct.Struct("<Bqb")
+OP_CODES = {"insert": 1, "delete": 2, "search": 3}
+OP_NAMES = {code: op for op, code in OP_CODES.items()}
+CHUNK_RECORDS = 65536
+
+class TraceRecorder:
+    """Appends every insert, delete and search made on the attached trees to a trace file.
+    
+    Records are packed into an in-memory buffer that is written out every
+    buffer_records operations and on close.
+    """
+    def __init__(self, path, buffer_records=CHUNK_RECORDS):
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.buffer = bytearray()
+        self.limit = buffer_records * RECORD.size
+        self.records = 0
+    
+    def attach(self, tree):
+        tree.add_hook(self._hook)
+        return tree
+    
+    def attach_to(self, tree):
+        """attach() that returns the recorder, for chaining"""
+        self.attach(tree)
+        return self
+    
+    def detach(self, tree):
+        tree.remove_hook(self._hook)
+        return tree
+    
+    def _hook(self, op, method):
+        code = OP_CODES[op]
+        pack = RECORD.pack
+        buffer = self.buffer
+        def recorded(key):
+            result = method(key)
+            buffer.extend(pack(code, key, -1 if result is None else 1 if result else 0))
+            if len(buffer) >= self.limit:
+                self.flush()
+            return result
+        return recorded
+    
+    def flush(self):
+        self.records += len(self.buffer) // RECORD.size
+        self.file.write(self.buffer)
+        self.buffer.clear()
+    
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def read_trace(path, chunk_records=CHUNK_RECORDS):
+    """Stream (op, key, result) tuples from a trace file, one chunk at a time"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a tree trace file")
+        while True:
+            chunk = f.read(chunk_records * RECORD.size)
+            if not chunk:
+                return
+            if len(chunk) % RECORD.size:
+                raise ValueError(f"{path} ends with a partial record")
+            yield from RECORD.iter_unpack(chunk)
+
+def record_workload(path, data, seed=None):
+    """Write a trace of the benchmark workload: insert all, search hits and misses, delete half"""
+    rng = random.Random(seed)
+    tree = TREE_TYPES["AVLTree"]()
+    with TraceRecorder(path) as recorder:
+        recorder.attach(tree)
+        for key in data:
+            tree.insert(key)
+        present = list(data)
+        rng.shuffle(present)
+        top = max(data) + 1 if data else 1
+        probes = present + [top + i for i in range(len(present))]
+        rng.shuffle(probes)
+        for key in probes:
+            tree.search(key)
+        for key in present[:len(present) // 2]:
+            tree.delete(key)
+        recorder.detach(tree)
+    return recorder.records
+
+def replay(path, tree_names=None, lazy_fraction=None):
+    """Run a trace against each tree type, streaming it from disk every time.
+    
+    With lazy_fraction set the trees use tombstone deletes (Tree.enable_lazy_delete).
+    """
+    results = {}
+    for name in tree_names or list(TREE_TYPES):
+        tree = TREE_TYPES[name]()
+        if lazy_fraction is not None:
+            tree.enable_lazy_delete(lazy_fraction)
+        recorder = LatencyRecorder()
+        recorder.attach(tree)
+        methods = {code: getattr(tree, op) for code, op in OP_NAMES.items()}
+        records = 0
+        mismatches = 0
+        start = time.perf_counter()
+        for code, key, expected in read_trace(path):
+            result = methods[code](key)
+            if expected >= 0 and result is not None and bool(result) != bool(expected):
+                mismatches += 1
+            records += 1
+        elapsed = time.perf_counter() - start
+        recorder.detach(tree)
+        results[name] = {"operations": records, "seconds": elapsed,
+                         "ops_per_s": records / elapsed if elapsed else 0.0,
+                         "mismatches": mismatches, "latency": recorder.summary()}
+    return results
+
+def format_replay(results):
+    lines = [f"{'tree':<15}{'ops/s':>12}{'mismatch':>10}  " +
+             "  ".join(f"{op + ' p50/p99/p99.9':<28}" for op in OP_CODES)]
+    for name, r in results.items():
+        cells = []
+        for op in OP_CODES:
+            s = r["latency"].get(op)
+            cells.append("/".join(format_ns(s[k]) for k in ("p50_ns", "p99_ns", "p99.9_ns")) if s else "-")
+        lines.append(f"{name:<15}{r['ops_per_s']:>12,.0f}{r['mismatches']:>10}  " +
+                     "  ".join(f"{c:<28}" for c in cells))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay tree operation traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_cmd = commands.add_parser("record", help="write a trace of a test case workload")
+    record_cmd.add_argument("path")
+    record_cmd.add_argument("--case", type=int, choices=(1, 2, 3), default=2)
+    record_cmd.add_argument("--seed", type=int)
+    replay_cmd = commands.add_parser("replay", help="replay a trace against the tree types")
+    replay_cmd.add_argument("path")
+    replay_cmd.add_argument("--trees", nargs="+", choices=list(TREE_TYPES))
+    replay_cmd.add_argument("--lazy", type=float, metavar="FRACTION",
+                            help="use lazy deletion, rebuilding at this fraction of tombstones")
+    replay_cmd.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args()
+    
+    if args.command == "record":
+        random.seed(args.seed)
+        data = generate_test_cases()[args.case - 1]
+        count = record_workload(args.path, data, args.seed)
+        print(f"Wrote {count} operations to {args.path}")
+        return
+    results = replay(args.path, args.trees, args.lazy)
+    print(format_replay(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()